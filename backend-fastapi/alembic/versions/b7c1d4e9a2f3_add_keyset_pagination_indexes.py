@@ -0,0 +1,30 @@
+"""Add keyset pagination indexes
+
+Revision ID: b7c1d4e9a2f3
+Revises: e283d11561ee
+Create Date: 2026-10-19 10:12:31.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7c1d4e9a2f3'
+down_revision: Union[str, Sequence[str], None] = 'e283d11561ee'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # GET /documents and GET /chat/sessions/{id}/messages page by (created_at, id)
+    op.create_index('ix_documents_created_at_id', 'documents', ['created_at', 'id'], unique=False)
+    op.create_index('ix_messages_session_id_created_at_id', 'messages', ['session_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_messages_session_id_created_at_id', table_name='messages')
+    op.drop_index('ix_documents_created_at_id', table_name='documents')
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.api_v1.endpoints import chat, utils, login, users, documents
+from app.api.api_v1.endpoints import chat, utils, login, users, documents, templates, admin
 
 api_router = APIRouter()
 
@@ -8,3 +8,5 @@ api_router.include_router(chat.router, prefix="/chat", tags=["chat"])
 api_router.include_router(login.router, tags=["login"])
 api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(documents.router, prefix="/documents", tags=["documents"])
+api_router.include_router(templates.router, prefix="/templates", tags=["templates"])
+api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
@@ -0,0 +1,34 @@
+from typing import Any, List
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse, Response
+
+from app.api import deps
+from app.core.profiling import profile_store
+
+router = APIRouter(dependencies=[Depends(deps.require_profile_token)])
+
+@router.get("/profiles")
+def list_profiles() -> List[Any]:
+    """Profiles kept by the worker that answers, newest first"""
+    return [profile.summary() for profile in profile_store.list()]
+
+@router.get("/profiles/{profile_id}")
+def download_profile(profile_id: str, format: str = Query("pstats", pattern="^(pstats|speedscope)$")) -> Any:
+    """
+    One profile as a pstats file (python -m pstats, snakeviz) or speedscope
+    JSON (https://www.speedscope.app).
+    """
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found on this worker")
+    if format == "speedscope":
+        return JSONResponse(
+            profile.to_speedscope(),
+            headers={"Content-Disposition": f'attachment; filename="{profile_id}.speedscope.json"'},
+        )
+    return Response(
+        profile.to_pstats(),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.prof"'},
+    )
@@ -1,59 +1,109 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import Any
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import ORJSONResponse
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
 import time
+import uuid
 
 from app.schemas.chat import ChatRequest, ChatResponse, OllamaStatus
-from app.services.ollama_service import ollama_service
+from app.services.ollama_service import OllamaService
 
 router = APIRouter()
 
 from app.api import deps
+from app.api.pagination import MAX_PAGE_SIZE, keyset_page, parse_fields
+from app.core.config import settings
+from app.models.chat import ChatSession, Message
+from app.models.document import Document
+from app.models.user import User
 from sqlmodel import Session
-from app.services.document_service import document_service
+from app.services.document_service import DocumentService
+from app.services.fast_path import FastPathDecision, decide, extractive_response
+from app.services.llm_scheduler import LLMScheduler, QueueFull, QueueTimeout, Ticket
+from app.services.pipeline import Stage, StageTimeout, run_stages
+
+MESSAGE_FIELDS = list(Message.__fields__)
 
 @router.post("/", response_model=ChatResponse)
 async def chat(
     request: ChatRequest,
-    db: Session = Depends(deps.get_db)
+    http_request: Request,
+    http_response: Response,
+    db: Session = Depends(deps.get_db),
+    ollama_service: OllamaService = Depends(deps.get_ollama),
+    document_service: DocumentService = Depends(deps.get_documents),
+    scheduler: LLMScheduler = Depends(deps.get_scheduler),
+    current_user: Optional[User] = Depends(deps.get_current_user_optional),
 ) -> Any:
     """
-    Chat endpoint using Ollama local LLM with RAG
+    Chat endpoint using Ollama local LLM with RAG.
+    The health check, query embedding and index refresh run concurrently;
+    retrieval or embedding that exceed their timeout are dropped and the
+    question is answered without context (listed in metadata.degraded).
+    With CHAT_FAST_PATH_ENABLED, a close match on a curated FAQ chunk is
+    answered from the chunk without generation (metadata.fast_path).
+    Generation is queued fairly per user (premium users first under load);
+    X-Queue-Position and X-Queue-Wait-Ms report the time spent queued.
     """
     if not request.message:
         raise HTTPException(status_code=400, detail="Message is required")
     
-    if not ollama_service.is_model_available():
-        raise HTTPException(
-            status_code=503, 
-            detail="Ollama service is not available. Please make sure Ollama is running and the model is installed."
-        )
-    
     start_time = time.time()
-    
-    # RAG: Search for relevant documents
-    try:
-        relevant_docs = await document_service.search_relevant_documents(db, request.message)
-    except Exception as e:
-        print(f"RAG Error: {e}")
-        relevant_docs = []
-        
-    # Prepare message with context if documents found
-    if relevant_docs:
-        context_str = "\n\n".join([f"Documento: {doc.title}\n{doc.content}" for doc in relevant_docs])
-        # Construct a prompt that includes context
-        # We prepend it to the user message so Ollama sees it clearly
-        final_message = f"""Usa el siguiente contexto para responder la pregunta, si es relevante:
-        
-{context_str}
 
-Pregunta del usuario: {request.message}"""
-        
-        sources = [doc.title for doc in relevant_docs]
-    else:
-        final_message = request.message
-        sources = []
+    async def health() -> None:
+        if not await asyncio.to_thread(ollama_service.is_model_available):
+            raise HTTPException(
+                status_code=503, 
+                detail="Ollama service is not available. Please make sure Ollama is running and the model is installed."
+            )
+
+    async def embedding() -> List[float]:
+        return await asyncio.to_thread(ollama_service.get_embeddings, request.message)
+
+    async def index() -> None:
+        # Shielded: a slow load keeps going for later requests after a timeout
+        if settings.RETRIEVAL_MODE == "index":
+            await asyncio.shield(document_service.prefetch_index())
+
+    async def retrieval(embedding: List[float], index: None) -> List[Tuple[float, Document]]:
+        return await document_service.search_by_embedding(db, embedding)
 
-    response = await ollama_service.chat(final_message, request.chat_history)
+    async def generation(
+        health: None, retrieval: List[Tuple[float, Document]]
+    ) -> Tuple[Dict[str, Any], Optional[Ticket], FastPathDecision]:
+        # A curated answer that matches well enough is returned as is
+        fast_path = decide(retrieval)
+        if fast_path.answer:
+            return extractive_response(fast_path, ollama_service.average_chat_seconds), None, fast_path
+
+        # Context goes into the last message; see OllamaService.build_messages
+        context = [(doc.title, doc.content) for _, doc in retrieval]
+        # Anonymous callers are queued per client address
+        user_key = str(current_user.id) if current_user else f"ip:{http_request.client.host if http_request.client else 'unknown'}"
+        async with scheduler.slot(
+            user_key,
+            premium=bool(current_user and current_user.is_premium),
+            timeout=settings.LLM_QUEUE_TIMEOUT_SECONDS,
+        ) as ticket:
+            return await ollama_service.chat(request.message, request.chat_history, context), ticket, fast_path
+
+    try:
+        stages = await run_stages("chat", [
+            Stage("health", health, timeout=settings.CHAT_HEALTH_TIMEOUT_SECONDS),
+            Stage("embedding", embedding, timeout=settings.CHAT_EMBEDDING_TIMEOUT_SECONDS, fallback=[]),
+            Stage("index", index, timeout=settings.CHAT_RETRIEVAL_TIMEOUT_SECONDS, fallback=None),
+            Stage("retrieval", retrieval, after=["embedding", "index"], timeout=settings.CHAT_RETRIEVAL_TIMEOUT_SECONDS, fallback=[]),
+            Stage("generation", generation, after=["health", "retrieval"]),
+        ])
+    except (QueueFull, QueueTimeout) as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
+    except StageTimeout as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    response, ticket, fast_path = stages.values["generation"]
+    if ticket is not None:
+        http_response.headers["X-Queue-Position"] = str(ticket.position)
+        http_response.headers["X-Queue-Wait-Ms"] = f"{ticket.wait_seconds * 1000:.0f}"
     processing_time = time.time() - start_time
     
     if "error" in response:
@@ -61,14 +111,20 @@ Pregunta del usuario: {request.message}"""
         
     return ChatResponse(
         message=response["message"],
-        sources=sources,
+        sources=response.get("sources") or [doc.title for _, doc in stages.values["retrieval"]],
         model_used=response.get("model_used"),
         processing_time=processing_time,
-        timestamp=time.strftime('%Y-%m-%dT%H:%M:%SZ')
+        timestamp=time.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        metadata={
+            **(response.get("metadata") or {}),
+            "stages_ms": stages.timings_ms,
+            "degraded": stages.degraded,
+            "fast_path": fast_path.metadata(),
+        },
     )
 
 @router.get("/status", response_model=OllamaStatus)
-def ollama_status() -> Any:
+def ollama_status(ollama_service: OllamaService = Depends(deps.get_ollama)) -> Any:
     """Check Ollama service status and available models"""
     is_available = ollama_service.is_model_available()
     models = ollama_service.get_available_models()
@@ -79,3 +135,30 @@ def ollama_status() -> Any:
         available_models=models,
         current_model=ollama_service.model
     )
+
+@router.get("/sessions/{session_id}/messages", response_class=ORJSONResponse)
+async def list_messages(
+    session_id: uuid.UUID,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(None, description="Comma-separated fields"),
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Messages of one of the current user's chat sessions, oldest first.
+    Pass the returned next_cursor to get the next page.
+    """
+    chat_session = await db.get(ChatSession, session_id)
+    if chat_session is None or chat_session.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Chat session not found")
+
+    page = await keyset_page(
+        db,
+        Message,
+        parse_fields(fields, MESSAGE_FIELDS, MESSAGE_FIELDS),
+        filters=[Message.session_id == session_id],
+        cursor=cursor,
+        limit=limit,
+    )
+    return ORJSONResponse(page)
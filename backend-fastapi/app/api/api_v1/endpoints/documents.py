@@ -1,29 +1,64 @@
-from fastapi import APIRouter, Depends, HTTPException, Body, UploadFile, File
+import json
+import uuid
+from fastapi import APIRouter, Depends, HTTPException, Body, UploadFile, File, Query, Request
+from fastapi.responses import ORJSONResponse
 from sqlmodel import Session
-from typing import Any, List
-from pydantic import BaseModel
-import fitz  # PyMuPDF
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from pydantic import BaseModel, ValidationError, field_validator
 
 from app.api import deps
-from app.services.document_service import document_service
+from app.api.pagination import MAX_PAGE_SIZE, keyset_page, parse_fields
+from app.core.config import settings
+from app.core.ndjson import LineTooLong, NDJSONStreamingResponse, dumps_line, iter_lines
+from app.db.session import async_session
+from app.services.document_service import DocumentService
 from app.models.document import Document
+from app.models.user import User
 
 router = APIRouter()
 
+DOCUMENT_FIELDS = list(Document.__fields__)
+# Embeddings are thousands of floats per row, so they are opt-in
+DEFAULT_DOCUMENT_FIELDS = [field for field in DOCUMENT_FIELDS if field != "embedding_vector"]
+
 class DocumentCreate(BaseModel):
     title: str
     content: str
     document_type: str = "article"
     source_url: str = None
 
+class DocumentUpdate(BaseModel):
+    title: Optional[str] = None
+    content: Optional[str] = None
+    document_type: Optional[str] = None
+    # The only nullable column; an explicit null clears it
+    source_url: Optional[str] = None
+
+    @field_validator("title", "content", "document_type")
+    @classmethod
+    def not_null(cls, value: Optional[str]) -> str:
+        # Omit a field to leave it unchanged; null is not a valid value
+        if value is None:
+            raise ValueError("may be omitted but not null")
+        return value
+
+class SourceReplace(BaseModel):
+    source_url: str
+    title: str
+    content: str
+    document_type: str = "article"
+
 @router.post("/upload-pdf", response_model=Document)
 async def upload_pdf(
     file: UploadFile = File(...),
-    db: Session = Depends(deps.get_db)
+    db: Session = Depends(deps.get_db),
+    document_service: DocumentService = Depends(deps.get_documents),
 ) -> Any:
     """
     Upload a PDF file, extract text, and create a document with embeddings.
     """
+    import fitz  # PyMuPDF, loaded on the first upload
+
     if not file.filename.lower().endswith('.pdf'):
         raise HTTPException(status_code=400, detail="File must be a PDF")
     
@@ -60,10 +95,38 @@ async def upload_pdf(
         print(f"Error processing PDF: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to process PDF: {str(e)}")
 
+@router.get("/", response_class=ORJSONResponse)
+async def list_documents(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(None, description="Comma-separated fields; embedding_vector is excluded unless listed"),
+    document_type: Optional[str] = None,
+    source_url: Optional[str] = None,
+    db: Session = Depends(deps.get_db),
+) -> Any:
+    """
+    List documents oldest first. Pass the returned next_cursor to get the next page.
+    """
+    filters = []
+    if document_type is not None:
+        filters.append(Document.document_type == document_type)
+    if source_url is not None:
+        filters.append(Document.source_url == source_url)
+    page = await keyset_page(
+        db,
+        Document,
+        parse_fields(fields, DOCUMENT_FIELDS, DEFAULT_DOCUMENT_FIELDS),
+        filters=filters,
+        cursor=cursor,
+        limit=limit,
+    )
+    return ORJSONResponse(page)
+
 @router.post("/", response_model=Document)
 async def create_document(
     doc_in: DocumentCreate,
-    db: Session = Depends(deps.get_db)
+    db: Session = Depends(deps.get_db),
+    document_service: DocumentService = Depends(deps.get_documents),
 ) -> Any:
     """
     Create a new document and generate embeddings for RAG.
@@ -79,3 +142,140 @@ async def create_document(
         return doc
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create document: {str(e)}")
+
+async def _flush_batch(
+    document_service: DocumentService, batch: List[Tuple[int, DocumentCreate]]
+) -> List[Dict[str, Any]]:
+    """Create one batch of documents and describe the outcome of each line"""
+    try:
+        # Own session: with a streaming response the request's dependencies
+        # are closed before the body has been consumed
+        async with async_session() as db:
+            ids = await document_service.create_documents_batch(db, [doc.dict() for _, doc in batch])
+    except Exception as e:
+        return [{"line": line_no, "status": "error", "error": f"Failed to create document: {e}"} for line_no, _ in batch]
+    return [
+        {"line": line_no, "status": "created", "id": str(doc_id)}
+        if doc_id is not None
+        else {"line": line_no, "status": "error", "error": "Failed to generate embedding"}
+        for (line_no, _), doc_id in zip(batch, ids)
+    ]
+
+async def _ingest_ndjson(request: Request, document_service: DocumentService) -> AsyncIterator[bytes]:
+    created = failed = 0
+    batch: List[Tuple[int, DocumentCreate]] = []
+
+    async def flush():
+        nonlocal created, failed
+        for result in await _flush_batch(document_service, batch):
+            if result["status"] == "created":
+                created += 1
+            else:
+                failed += 1
+            yield dumps_line(result)
+        batch.clear()
+
+    try:
+        async for line_no, line in iter_lines(request.stream(), settings.DOCUMENT_BATCH_MAX_LINE_BYTES):
+            try:
+                batch.append((line_no, DocumentCreate(**json.loads(line))))
+            except (ValueError, TypeError, ValidationError) as e:
+                failed += 1
+                yield dumps_line({"line": line_no, "status": "error", "error": str(e)})
+                continue
+            if len(batch) >= settings.DOCUMENT_BATCH_SIZE:
+                async for result in flush():
+                    yield result
+    except LineTooLong as e:
+        failed += 1
+        yield dumps_line({"status": "error", "error": str(e)})
+
+    if batch:
+        async for result in flush():
+            yield result
+    yield dumps_line({"status": "done", "created": created, "failed": failed})
+
+@router.post("/batch", response_class=NDJSONStreamingResponse)
+async def create_documents_batch(
+    request: Request,
+    document_service: DocumentService = Depends(deps.get_documents),
+) -> Any:
+    """
+    Create documents from an NDJSON body, one DocumentCreate object per line.
+    Lines are parsed as they arrive and embedded and inserted in batches of
+    DOCUMENT_BATCH_SIZE. One result line is streamed back per input line,
+    followed by a summary line.
+    """
+    return NDJSONStreamingResponse(_ingest_ndjson(request, document_service))
+
+# /source is declared before /{document_id} so it isn't parsed as an id
+@router.put("/source")
+async def replace_source(
+    source_in: SourceReplace,
+    db: Session = Depends(deps.get_db),
+    document_service: DocumentService = Depends(deps.get_documents),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Replace the content of a whole source (all chunks with this source_url).
+    Unchanged chunks keep their embeddings; only new text is embedded.
+    """
+    try:
+        counts = await document_service.replace_source(
+            db=db,
+            source_url=source_in.source_url,
+            title=source_in.title,
+            content=source_in.content,
+            document_type=source_in.document_type,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to update source: {str(e)}")
+    return {"source_url": source_in.source_url, **counts}
+
+@router.delete("/source")
+async def delete_source(
+    source_url: str,
+    db: Session = Depends(deps.get_db),
+    document_service: DocumentService = Depends(deps.get_documents),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Delete every chunk of a source.
+    """
+    deleted = await document_service.delete_source(db, source_url)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="No documents for this source_url")
+    return {"source_url": source_url, "deleted": deleted}
+
+@router.put("/{document_id}", response_model=Document)
+async def update_document(
+    document_id: uuid.UUID,
+    doc_in: DocumentUpdate,
+    db: Session = Depends(deps.get_db),
+    document_service: DocumentService = Depends(deps.get_documents),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Update a document. It is only re-embedded when its content changes.
+    """
+    try:
+        doc = await document_service.update_document(db, document_id, doc_in.dict(exclude_unset=True))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to update document: {str(e)}")
+    if doc is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return doc
+
+@router.delete("/{document_id}")
+async def delete_document(
+    document_id: uuid.UUID,
+    db: Session = Depends(deps.get_db),
+    document_service: DocumentService = Depends(deps.get_documents),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Delete a single document.
+    """
+    if not await document_service.delete_document(db, document_id):
+        raise HTTPException(status_code=404, detail="Document not found")
+    return {"id": str(document_id), "deleted": True}
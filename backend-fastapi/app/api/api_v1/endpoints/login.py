@@ -1,3 +1,4 @@
+import asyncio
 from datetime import timedelta
 from typing import Any
 from fastapi import APIRouter, Depends, HTTPException
@@ -23,9 +24,34 @@ async def login_access_token(
     # Find user by email (using username field of form_data as email)
     result = await db.execute(select(User).where(User.email == form_data.username))
     user = result.scalars().first()
-    
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    if not user:
         raise HTTPException(status_code=400, detail="Incorrect email or password")
+
+    # bcrypt is CPU-bound; cap concurrent logins and hash off the event loop
+    try:
+        await asyncio.wait_for(
+            security.login_slots.acquire(), timeout=settings.LOGIN_QUEUE_TIMEOUT_SECONDS
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many concurrent logins, please retry",
+            headers={"Retry-After": "1"},
+        )
+    try:
+        valid, new_hash = await security.verify_and_update_password(
+            form_data.password, user.hashed_password
+        )
+    finally:
+        security.login_slots.release()
+
+    if not valid:
+        raise HTTPException(status_code=400, detail="Incorrect email or password")
+
+    # Transparently upgrade hashes created with a different BCRYPT_ROUNDS
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
     
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     return {
@@ -0,0 +1,73 @@
+import uuid
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
+from sqlmodel import Session
+from typing import Any
+
+from app.api import deps
+from app.core.config import settings
+from app.models.user import User
+from app.schemas.template import TemplateRenderBatchRequest, TemplateRenderRequest
+from app.services.template_service import TemplateError, TemplateService
+
+router = APIRouter()
+
+async def _load_template(
+    template_id: uuid.UUID, db: Session, template_service: TemplateService, current_user: User
+) -> Any:
+    try:
+        found = await template_service.get_template(db, template_id)
+    except TemplateError as e:
+        raise HTTPException(status_code=422, detail=f"Template is invalid: {e}")
+    if found is None:
+        raise HTTPException(status_code=404, detail="Template not found")
+    template, compiled = found
+    if template.is_premium and not current_user.is_premium:
+        raise HTTPException(status_code=403, detail="This template requires a premium account")
+    return template, compiled
+
+@router.post("/{template_id}/render")
+async def render_template(
+    template_id: uuid.UUID,
+    render_in: TemplateRenderRequest,
+    db: Session = Depends(deps.get_db),
+    template_service: TemplateService = Depends(deps.get_templates),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Fill in a template with one set of field values.
+    """
+    template, compiled = await _load_template(template_id, db, template_service, current_user)
+    try:
+        content = compiled.render(render_in.values)
+    except TemplateError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"template_id": str(template.id), "template_name": template.name, "content": content}
+
+@router.post("/{template_id}/render-batch")
+async def render_template_batch(
+    template_id: uuid.UUID,
+    batch_in: TemplateRenderBatchRequest,
+    db: Session = Depends(deps.get_db),
+    template_service: TemplateService = Depends(deps.get_templates),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Fill in a template with many sets of field values in one call.
+    The template is parsed once and reused; invalid items are reported in
+    their result without failing the batch.
+    """
+    if len(batch_in.items) > settings.TEMPLATE_RENDER_BATCH_MAX:
+        raise HTTPException(
+            status_code=413, detail=f"At most {settings.TEMPLATE_RENDER_BATCH_MAX} items per batch"
+        )
+    template, compiled = await _load_template(template_id, db, template_service, current_user)
+    results = template_service.render_batch(compiled, batch_in.items)
+    failed = sum(1 for result in results if "error" in result)
+    return ORJSONResponse({
+        "template_id": str(template.id),
+        "template_name": template.name,
+        "rendered": len(results) - failed,
+        "failed": failed,
+        "results": results,
+    })
@@ -40,7 +40,7 @@ async def create_user(
     user_obj = User(
         username=user_in.username,
         email=user_in.email,
-        hashed_password=security.get_password_hash(user_in.password),
+        hashed_password=await security.get_password_hash_async(user_in.password),
         language_preference=user_in.language_preference,
         is_premium=user_in.is_premium
     )
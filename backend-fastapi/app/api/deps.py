@@ -1,28 +1,64 @@
 from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt
 from pydantic import ValidationError
+from sqlalchemy import event
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 
 from app.core import security
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.profiling import token_matches
 from app.db.session import async_session
 from app.models.user import User
 from app.schemas.token import TokenPayload
+from app.services.document_service import DocumentService, get_document_service
+from app.services.llm_scheduler import LLMScheduler, get_llm_scheduler
+from app.services.ollama_service import OllamaService, get_ollama_service
+from app.services.template_service import TemplateService, get_template_service
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/login/access-token"
 )
+optional_oauth2 = OAuth2PasswordBearer(
+    tokenUrl=f"{settings.API_V1_STR}/login/access-token", auto_error=False
+)
+
+# Token sub -> User. Entries are detached instances shared between requests,
+# so handlers that modify a user must load it in their own session.
+user_cache: TTLCache[User] = TTLCache(
+    max_size=settings.USER_CACHE_MAX_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS
+)
+
+def invalidate_user(user_id) -> None:
+    """Drop a user from the cache, e.g. after changing its row"""
+    user_cache.invalidate(str(user_id))
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_user_on_change(mapper, connection, target: User) -> None:
+    invalidate_user(target.id)
+
+async def get_ollama() -> OllamaService:
+    """Ollama client, constructed on first use rather than at import"""
+    return get_ollama_service()
+
+async def get_documents() -> DocumentService:
+    return get_document_service()
+
+async def get_scheduler() -> LLMScheduler:
+    return get_llm_scheduler()
+
+async def get_templates() -> TemplateService:
+    return get_template_service()
 
 async def get_db() -> Generator:
     async with async_session() as session:
         yield session
 
-async def get_current_user(
-    db: async_session = Depends(get_db), token: str = Depends(reusable_oauth2)
-) -> User:
+async def get_current_user(token: str = Depends(reusable_oauth2)) -> User:
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
@@ -33,11 +69,38 @@ async def get_current_user(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    
-    result = await db.execute(select(User).where(User.id == token_data.sub))
-    user = result.scalars().first()
-    
+
+    # Hot path: no session is opened when the user is cached
+    user = user_cache.get(token_data.sub)
+    if user is not None:
+        return user
+
+    async with async_session() as db:
+        result = await db.execute(select(User).where(User.id == token_data.sub))
+        user = result.scalars().first()
+
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    user_cache.set(token_data.sub, user)
     return user
 
+async def get_current_user_optional(token: Optional[str] = Depends(optional_oauth2)) -> Optional[User]:
+    """
+    The authenticated user, or None for anonymous requests. An expired or
+    invalid token, or one for a deleted user, is treated as anonymous.
+    """
+    if not token:
+        return None
+    try:
+        return await get_current_user(token)
+    except HTTPException as e:
+        if e.status_code in (status.HTTP_403_FORBIDDEN, status.HTTP_404_NOT_FOUND):
+            return None
+        raise
+
+async def require_profile_token(x_profile_token: Optional[str] = Header(None)) -> None:
+    """Admin access to profiles; hidden entirely while profiling is disabled"""
+    if not settings.PROFILE_TOKEN:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if not token_matches(x_profile_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid profile token")
@@ -0,0 +1,67 @@
+import base64
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import literal, tuple_
+from sqlmodel import Session, select
+
+MAX_PAGE_SIZE = 500
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str], default: Sequence[str]) -> List[str]:
+    """Comma-separated field selection, validated against the model's columns"""
+    if not fields:
+        return list(default)
+    selected = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in selected if field not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(allowed)}",
+        )
+    return list(dict.fromkeys(selected))
+
+def encode_cursor(created_at: datetime, row_id: uuid.UUID) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{row_id}".encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    try:
+        created_at, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(row_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def keyset_page(
+    db: Session,
+    model: Any,
+    fields: Sequence[str],
+    filters: Sequence[Any] = (),
+    cursor: Optional[str] = None,
+    limit: int = 50,
+) -> Dict[str, Any]:
+    """
+    One page of model rows ordered by (created_at, id), selecting only fields.
+    The cursor is the position of the last row returned, so each page is an
+    index range scan however deep the client has paged.
+    """
+    statement = select(*[getattr(model, field) for field in fields], model.created_at, model.id)
+    for condition in filters:
+        statement = statement.where(condition)
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        statement = statement.where(
+            tuple_(model.created_at, model.id)
+            > tuple_(literal(created_at, model.created_at.type), literal(row_id, model.id.type))
+        )
+    statement = statement.order_by(model.created_at, model.id).limit(limit + 1)
+    rows = (await db.execute(statement)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][-2], rows[-1][-1])
+    return {
+        "items": [dict(zip(fields, row)) for row in rows],
+        "next_cursor": next_cursor,
+    }
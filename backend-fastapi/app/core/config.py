@@ -6,6 +6,16 @@ class Settings(BaseSettings):
     API_V1_STR: str = "/api/v1"
     SECRET_KEY: str = "YOUR_SECRET_KEY_HERE_CHANGE_IN_PRODUCTION"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # 8 days
+
+    # Authenticated user cache (token sub -> User), per worker process
+    USER_CACHE_TTL_SECONDS: float = 30.0
+    USER_CACHE_MAX_SIZE: int = 10000
+
+    # Password hashing. Changing BCRYPT_ROUNDS rehashes passwords on next login.
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    LOGIN_MAX_CONCURRENCY: int = 8
+    LOGIN_QUEUE_TIMEOUT_SECONDS: float = 5.0
     
     # CORS
     BACKEND_CORS_ORIGINS: List[str] = [
@@ -19,11 +29,110 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str = ""
     POSTGRES_DB: str = "paraguay_guide"
     DATABASE_URI: Optional[str] = None
+    # Connection pool per worker process (and per script). Checkouts wait up
+    # to DB_POOL_TIMEOUT_SECONDS once all DB_POOL_SIZE + DB_MAX_OVERFLOW
+    # connections are in use.
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = False
+    # Prepared statements cached per asyncpg connection; set 0 behind
+    # pgbouncer in transaction mode
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    # Fraction of SQL statements printed with their duration (1.0 prints all);
+    # statements slower than DB_SLOW_QUERY_MS are always printed (0 disables)
+    DB_LOG_SAMPLE_RATE: float = 0.0
+    DB_SLOW_QUERY_MS: float = 0.0
 
     # Ollama
     OLLAMA_HOST: str = "http://localhost:11434"
     OLLAMA_MODEL: str = "llama3.2:latest"
     OLLAMA_EMBEDDING_MODEL: str = "nomic-embed-text"
+    OLLAMA_KEEP_ALIVE: str = "30m"
+    # num_ctx is the smallest power of two from OLLAMA_MIN_CTX to OLLAMA_MAX_CTX
+    # that fits the estimated prompt plus OLLAMA_NUM_PREDICT reply tokens
+    OLLAMA_MIN_CTX: int = 2048
+    OLLAMA_MAX_CTX: int = 8192
+    OLLAMA_NUM_PREDICT: int = 1024
+    OLLAMA_CHARS_PER_TOKEN: float = 3.5
+    # Chat history sent with each message; the window advances in steps so
+    # consecutive requests share a cacheable prefix
+    OLLAMA_HISTORY_MESSAGES: int = 10
+    OLLAMA_HISTORY_STEP: int = 4
+
+    # Chat scheduling (per worker): LLM_MAX_CONCURRENCY requests reach Ollama
+    # at once, shared by weighted fair queueing between users. Premium users
+    # weigh LLM_PREMIUM_WEIGHT; anonymous callers are queued per client IP.
+    LLM_MAX_CONCURRENCY: int = 2
+    LLM_PREMIUM_WEIGHT: float = 4.0
+    LLM_USER_MAX_CONCURRENCY: int = 1
+    LLM_MAX_QUEUE: int = 100
+    LLM_QUEUE_TIMEOUT_SECONDS: float = 120.0
+    # /chat/ stage timeouts. The health check must pass; a slow embedding or
+    # retrieval stage is dropped and the question answered without context.
+    CHAT_HEALTH_TIMEOUT_SECONDS: float = 2.0
+    CHAT_EMBEDDING_TIMEOUT_SECONDS: float = 5.0
+    CHAT_RETRIEVAL_TIMEOUT_SECONDS: float = 3.0
+    # Extractive fast path: when the best hit is a curated answer (one of
+    # CHAT_FAST_PATH_DOCUMENT_TYPES) scoring at least CHAT_FAST_PATH_MIN_SCORE,
+    # its answer text (up to CHAT_FAST_PATH_MAX_CHARS) is returned without
+    # LLM generation
+    CHAT_FAST_PATH_ENABLED: bool = False
+    CHAT_FAST_PATH_MIN_SCORE: float = 0.85
+    CHAT_FAST_PATH_DOCUMENT_TYPES: List[str] = ["faq"]
+    CHAT_FAST_PATH_MAX_CHARS: int = 800
+    # Matryoshka truncation of embeddings (e.g. 256 or 512 for nomic-embed-text),
+    # applied to new embeddings, stored rows loaded into the index and queries.
+    # Unset keeps the model's full dimension.
+    EMBEDDING_DIMENSIONS: Optional[int] = None
+
+    # Startup warm-up (DB pool, index snapshot, models); /ready is 503 until done
+    WARMUP_ENABLED: bool = True
+    WARMUP_RETRY_SECONDS: float = 10.0
+
+    # Retrieval
+    # "index": vector index, refreshed from the DB every INDEX_REFRESH_SECONDS
+    # "scan": score an (id, embedding) scan of the documents table on every query
+    RETRIEVAL_MODE: str = "index"
+    INDEX_REFRESH_SECONDS: float = 5.0
+    # Memory-mapped index file shared by all workers; empty keeps a private
+    # in-memory index per worker. Rebuilt once rows added since the last build
+    # exceed INDEX_REBUILD_MIN_ROWS and INDEX_REBUILD_RATIO of the file.
+    VECTOR_INDEX_PATH: str = "data/vector_index.bin"
+    INDEX_REBUILD_MIN_ROWS: int = 1000
+    INDEX_REBUILD_RATIO: float = 0.1
+    CONTENT_CACHE_SIZE: int = 512
+    # Threads scoring one query over shards of the index; 1 scores on the
+    # calling thread. Small indexes are never split below 16k rows per shard.
+    SEARCH_SHARDS: int = 1
+    # Document changes are broadcast with Postgres NOTIFY and applied by every
+    # worker, instead of polling for new rows every INDEX_REFRESH_SECONDS
+    DOCUMENT_NOTIFY_ENABLED: bool = True
+    DOCUMENT_NOTIFY_RETRY_SECONDS: float = 5.0
+    # Maximal marginal relevance: the top MMR_CANDIDATES hits are reranked
+    # down to k, trading relevance (1.0) against novelty (0.0). 1.0 disables it.
+    MMR_LAMBDA: float = 0.7
+    MMR_CANDIDATES: int = 50
+
+    # On-demand profiling (see app/core/profiling.py): requests sent with
+    # "X-Profile: <PROFILE_TOKEN>", and a PROFILE_SAMPLE_RATE fraction of
+    # requests under PROFILE_PATHS, run under cProfile. The last
+    # PROFILE_MAX_STORED profiles per worker are downloadable from
+    # /admin/profiles with the same token. An empty token disables profiling.
+    PROFILE_TOKEN: str = ""
+    PROFILE_SAMPLE_RATE: float = 0.0
+    PROFILE_PATHS: List[str] = ["/api/v1/chat/", "/api/v1/documents/"]
+    PROFILE_MAX_STORED: int = 50
+
+    # Compiled DocumentTemplates kept per worker, and the largest render-batch
+    TEMPLATE_CACHE_SIZE: int = 256
+    TEMPLATE_RENDER_BATCH_MAX: int = 1000
+
+    # POST /documents/batch: documents per embedding request and commit, and
+    # the longest NDJSON line accepted
+    DOCUMENT_BATCH_SIZE: int = 64
+    DOCUMENT_BATCH_MAX_LINE_BYTES: int = 1024 * 1024
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,96 @@
+import asyncio
+from contextlib import AsyncExitStack, asynccontextmanager, suppress
+from typing import Awaitable, Callable, Dict, List
+
+from fastapi import FastAPI
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.session import async_session, engine
+from app.services.document_events import listen_for_changes
+from app.services.document_service import get_document_service
+from app.services.ollama_service import get_ollama_service
+
+class Readiness:
+    """Warm-up progress; the app is ready once every step is ok or skipped"""
+
+    def __init__(self, steps: List[str]):
+        self.steps: Dict[str, str] = {name: "pending" for name in steps}
+
+    @property
+    def ready(self) -> bool:
+        return all(state in ("ok", "skipped") for state in self.steps.values())
+
+async def open_db_pool() -> None:
+    """Open the pool's connections up front instead of on the first requests"""
+    size = engine.pool.size() if hasattr(engine.pool, "size") else 1
+    async with AsyncExitStack() as stack:
+        for _ in range(size):
+            conn = await stack.enter_async_context(engine.connect())
+            await conn.execute(text("SELECT 1"))
+
+async def load_index() -> None:
+    """Map the index snapshot, building it first if it is missing"""
+    async with async_session() as db:
+        await get_document_service().load_index(db)
+
+async def warm_chat_model() -> None:
+    ollama_service = get_ollama_service()
+    await asyncio.to_thread(ollama_service.warm_up, ollama_service.model)
+
+async def warm_embedding_model() -> None:
+    ollama_service = get_ollama_service()
+    await asyncio.to_thread(ollama_service.warm_up, ollama_service.embedding_model)
+
+WARMUP_STEPS: Dict[str, Callable[[], Awaitable[None]]] = {
+    "database": open_db_pool,
+    "index": load_index,
+    "chat_model": warm_chat_model,
+    "embedding_model": warm_embedding_model,
+}
+
+async def warm_up(readiness: Readiness) -> None:
+    """Run warm-up steps, retrying failed ones until all have succeeded"""
+
+    async def run(*names: str) -> None:
+        for name in names:
+            if readiness.steps[name] in ("ok", "skipped"):
+                continue
+            try:
+                await WARMUP_STEPS[name]()
+                readiness.steps[name] = "ok"
+            except Exception as e:
+                readiness.steps[name] = f"failed: {e}"
+                print(f"Warm-up step '{name}' failed: {e}")
+                return
+
+    while True:
+        # The index is loaded from the DB, so it waits for the pool
+        await asyncio.gather(run("database", "index"), run("chat_model"), run("embedding_model"))
+        if readiness.ready:
+            print("Warm-up complete, ready to serve")
+            return
+        await asyncio.sleep(settings.WARMUP_RETRY_SECONDS)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    readiness = Readiness(list(WARMUP_STEPS))
+    if settings.RETRIEVAL_MODE != "index":
+        readiness.steps["index"] = "skipped"
+    if not settings.WARMUP_ENABLED:
+        readiness.steps = {name: "skipped" for name in readiness.steps}
+    app.state.readiness = readiness
+
+    # Warm up in the background so liveness checks answer while /ready is 503
+    tasks = [asyncio.create_task(warm_up(readiness))]
+    if settings.DOCUMENT_NOTIFY_ENABLED and engine.dialect.name == "postgresql":
+        tasks.append(asyncio.create_task(listen_for_changes(get_document_service())))
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            with suppress(asyncio.CancelledError):
+                await task
+        await engine.dispose()
@@ -0,0 +1,45 @@
+import json
+from typing import Any, AsyncIterable, AsyncIterator, Tuple
+
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+class LineTooLong(ValueError):
+    pass
+
+async def iter_lines(chunks: AsyncIterable[bytes], max_line_bytes: int) -> AsyncIterator[Tuple[int, bytes]]:
+    """
+    Split a byte stream into (line number, line) pairs as it arrives.
+    Blank lines are skipped but still counted; only one partial line is buffered.
+    """
+    buffer = b""
+    line_no = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_no += 1
+            if len(line) > max_line_bytes:
+                raise LineTooLong(f"line {line_no} exceeds {max_line_bytes} bytes")
+            if line.strip():
+                yield line_no, line
+        if len(buffer) > max_line_bytes:
+            raise LineTooLong(f"line {line_no + 1} exceeds {max_line_bytes} bytes")
+    if buffer.strip():
+        yield line_no + 1, buffer
+
+def dumps_line(item: Any) -> bytes:
+    return json.dumps(item, default=str).encode() + b"\n"
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """
+    Streams NDJSON while the request body is still being read.
+    StreamingResponse normally also listens for a disconnect message, which
+    would consume the body messages the generator is waiting for.
+    """
+    media_type = "application/x-ndjson"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
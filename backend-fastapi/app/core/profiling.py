@@ -0,0 +1,191 @@
+"""
+On-demand request profiling.
+
+A request runs under cProfile when it carries ``X-Profile: <PROFILE_TOKEN>``
+or, for paths under PROFILE_PATHS, with probability PROFILE_SAMPLE_RATE. The
+result is kept in memory under the id returned in the ``X-Profile-Id``
+response header and downloaded from /api/v1/admin/profiles as pstats or
+speedscope JSON.
+
+cProfile sees everything the event loop runs while the request is in flight,
+so a profile also contains the interleaved work of concurrent requests, and
+at most one request per worker is profiled at a time. Work handed to threads
+(Ollama calls, password hashing) shows up as time spent awaiting it. The
+middleware is only installed when PROFILE_TOKEN is set.
+"""
+import cProfile
+import hmac
+import marshal
+import pstats
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+# pstats function key: (file, line, name)
+FunctionKey = Tuple[str, int, str]
+
+@dataclass
+class Profile:
+    id: str
+    method: str
+    path: str
+    trigger: str
+    started_at: datetime
+    duration_ms: float
+    stats: Dict[FunctionKey, tuple] = field(repr=False)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "trigger": self.trigger,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": self.duration_ms,
+        }
+
+    def to_pstats(self) -> bytes:
+        """Same bytes as pstats.Stats.dump_stats; load with pstats.Stats(path) or snakeviz"""
+        return marshal.dumps(self.stats)
+
+    def to_speedscope(self, min_fraction: float = 0.001) -> Dict[str, Any]:
+        """
+        Speedscope "sampled" profile rebuilt from the caller graph. cProfile
+        keeps inclusive time per caller -> callee edge, not per stack, so a
+        function reached along several paths has its callees split between
+        them in proportion; stacks under min_fraction of the total are dropped.
+        """
+        callees: Dict[FunctionKey, List[Tuple[FunctionKey, float]]] = {}
+        for func, (_, _, _, _, callers) in self.stats.items():
+            for caller, edge in callers.items():
+                callees.setdefault(caller, []).append((func, edge[3]))
+        roots = [func for func, (_, _, _, _, callers) in self.stats.items() if not callers]
+        total = sum(self.stats[func][3] for func in roots) or 1e-9
+
+        frames: List[Dict[str, Any]] = []
+        frame_index: Dict[FunctionKey, int] = {}
+        samples: List[List[int]] = []
+        weights: List[float] = []
+
+        def frame(func: FunctionKey) -> int:
+            if func not in frame_index:
+                filename, line, name = func
+                frame_index[func] = len(frames)
+                frames.append({"name": name, "file": filename, "line": line})
+            return frame_index[func]
+
+        def walk(func: FunctionKey, weight: float, stack: List[int], on_stack: set) -> None:
+            stack = stack + [frame(func)]
+            inclusive = self.stats[func][3] or 1e-9
+            children = 0.0
+            for callee, edge_time in callees.get(func, []):
+                if callee in on_stack:
+                    continue
+                child = weight * min(1.0, edge_time / inclusive)
+                if child >= total * min_fraction:
+                    walk(callee, child, stack, on_stack | {callee})
+                    children += child
+            if weight - children > 0:
+                samples.append(stack)
+                weights.append(weight - children)
+
+        for root in roots:
+            walk(root, self.stats[root][3], [], {root})
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"{self.method} {self.path}",
+            "exporter": settings.PROJECT_NAME,
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": f"{self.method} {self.path} ({self.id})",
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+class ProfileStore:
+    """The most recent profiles of this worker, oldest evicted first"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._profiles: "OrderedDict[str, Profile]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile: Profile) -> None:
+        with self._lock:
+            self._profiles[profile.id] = profile
+            while len(self._profiles) > self.max_size:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        return self._profiles.get(profile_id)
+
+    def list(self) -> List[Profile]:
+        return list(reversed(self._profiles.values()))
+
+profile_store = ProfileStore(max_size=settings.PROFILE_MAX_STORED)
+
+def token_matches(value: Optional[str]) -> bool:
+    return bool(settings.PROFILE_TOKEN and value) and hmac.compare_digest(value, settings.PROFILE_TOKEN)
+
+class ProfilingMiddleware:
+    """ASGI middleware; plain ASGI so streaming responses are profiled to the end"""
+
+    def __init__(self, app):
+        self.app = app
+        self._active = False
+
+    def _trigger(self, scope) -> Optional[str]:
+        for name, value in scope.get("headers", ()):
+            if name == b"x-profile":
+                return "header" if token_matches(value.decode("latin-1")) else None
+        if settings.PROFILE_SAMPLE_RATE and scope["path"].startswith(tuple(settings.PROFILE_PATHS)):
+            if random.random() < settings.PROFILE_SAMPLE_RATE:
+                return "sample"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self._active:
+            return await self.app(scope, receive, send)
+        trigger = self._trigger(scope)
+        if trigger is None:
+            return await self.app(scope, receive, send)
+
+        profile_id = uuid.uuid4().hex
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        self._active = True
+        started_at = datetime.utcnow()
+        start = time.perf_counter()
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.disable()
+            self._active = False
+            profile_store.add(Profile(
+                id=profile_id,
+                method=scope["method"],
+                path=scope["path"],
+                trigger=trigger,
+                started_at=started_at,
+                duration_ms=round((time.perf_counter() - start) * 1000, 1),
+                stats=pstats.Stats(profiler).stats,
+            ))
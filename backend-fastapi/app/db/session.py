@@ -1,12 +1,108 @@
+"""
+Engines and sessions.
+
+Both the app's async engine and the scripts' sync engine are built here with
+the pool settings from config, sampled SQL logging and pool metrics (checkout
+wait, connections in use, checkout timeouts) exported at /metrics.
+"""
+import random
+import time
+from typing import Any, Dict
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from app.core.config import settings
+from app.core.metrics import Counter, Gauge, Histogram
 
 # Since we are using SQLModel, we can pass the standard SQLAlchemy engine URL
 # But for async support we need asyncpg
 DATABASE_URL = settings.DATABASE_URI.replace("postgresql://", "postgresql+asyncpg://")
 
-engine = create_async_engine(DATABASE_URL, echo=True, future=True)
+pool_checkout_wait = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled DB connection", ["engine"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+pool_in_use = Gauge("db_pool_connections_in_use", "DB connections checked out of the pool", ["engine"])
+pool_timeouts = Counter("db_pool_timeouts_total", "Checkouts that gave up after DB_POOL_TIMEOUT_SECONDS", ["engine"])
+
+class _MeteredPoolMixin:
+    """Times every checkout, including the wait for a free connection"""
+    metric_name = ""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_timeouts.inc(engine=self.metric_name)
+            raise
+        finally:
+            pool_checkout_wait.observe(time.perf_counter() - start, engine=self.metric_name)
+
+class MeteredAsyncPool(_MeteredPoolMixin, AsyncAdaptedQueuePool):
+    metric_name = "async"
+
+class MeteredPool(_MeteredPoolMixin, QueuePool):
+    metric_name = "sync"
+
+def _pool_options() -> Dict[str, Any]:
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+def _instrument(sync_engine: Engine, name: str) -> None:
+    """Connection-in-use gauge and sampled statement logging"""
+
+    @event.listens_for(sync_engine.pool, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        pool_in_use.inc(engine=name)
+
+    @event.listens_for(sync_engine.pool, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        pool_in_use.dec(engine=name)
+
+    if not settings.DB_LOG_SAMPLE_RATE and not settings.DB_SLOW_QUERY_MS:
+        return
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info["query_start"].pop()) * 1000
+        slow = settings.DB_SLOW_QUERY_MS and elapsed_ms >= settings.DB_SLOW_QUERY_MS
+        if slow or random.random() < settings.DB_LOG_SAMPLE_RATE:
+            label = "slow SQL" if slow else "SQL"
+            print(f"[{label} {elapsed_ms:.1f}ms] {' '.join(statement.split())}")
+
+def make_async_engine(url: str = DATABASE_URL):
+    connect_args = {}
+    if url.startswith("postgresql+asyncpg"):
+        # SQLAlchemy's prepared-statement cache and asyncpg's own, per connection
+        connect_args = {
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        }
+    engine = create_async_engine(url, poolclass=MeteredAsyncPool, connect_args=connect_args, **_pool_options())
+    _instrument(engine.sync_engine, MeteredAsyncPool.metric_name)
+    return engine
+
+def make_sync_engine(url: str = None) -> Engine:
+    """psycopg2 engine for scripts, with the same pool settings and logging"""
+    engine = create_engine(url or settings.DATABASE_URI, poolclass=MeteredPool, **_pool_options())
+    _instrument(engine, MeteredPool.metric_name)
+    return engine
+
+engine = make_async_engine()
 
 async_session = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
@@ -1,12 +1,17 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from app.core.config import settings
+from app.core.lifespan import lifespan
+from app.core.metrics import render_metrics
+from app.core.profiling import ProfilingMiddleware
 from app.api.api_v1.api import api_router
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
 )
 
 # Set all CORS enabled origins
@@ -19,8 +24,26 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_headers=["*"],
     )
 
+# Only installed when a token is configured, so it costs nothing otherwise
+if settings.PROFILE_TOKEN:
+    app.add_middleware(ProfilingMiddleware)
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
 @app.get("/health")
 def health_check():
     return {"status": "healthy", "service": settings.PROJECT_NAME}
+
+@app.get("/ready")
+def readiness_check(request: Request):
+    """Ready once the DB pool, index snapshot and models are warm"""
+    readiness = getattr(request.app.state, "readiness", None)
+    if readiness is None or not readiness.ready:
+        steps = readiness.steps if readiness else {}
+        return JSONResponse(status_code=503, content={"status": "warming_up", "steps": steps})
+    return {"status": "ready", "steps": readiness.steps}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text format; values are per worker process"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -1,6 +1,7 @@
 import uuid
 from typing import Optional, List
 from datetime import datetime
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel, Relationship, Column, JSON
 
 class ChatSessionBase(SQLModel):
@@ -25,6 +26,8 @@ class MessageBase(SQLModel):
 
 class Message(MessageBase, table=True):
     __tablename__ = "messages"
+    # Keyset pagination order for GET /chat/sessions/{id}/messages
+    __table_args__ = (Index("ix_messages_session_id_created_at_id", "session_id", "created_at", "id"),)
 
     id: Optional[uuid.UUID] = Field(default_factory=uuid.uuid4, primary_key=True, index=True)
     session_id: uuid.UUID = Field(foreign_key="chat_sessions.id")
@@ -1,6 +1,7 @@
 import uuid
 from typing import Optional, List
 from datetime import datetime
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel, Column, JSON
 
 class DocumentBase(SQLModel):
@@ -13,6 +14,8 @@ class DocumentBase(SQLModel):
 
 class Document(DocumentBase, table=True):
     __tablename__ = "documents"
+    # Keyset pagination order for GET /documents
+    __table_args__ = (Index("ix_documents_created_at_id", "created_at", "id"),)
 
     id: Optional[uuid.UUID] = Field(default_factory=uuid.uuid4, primary_key=True, index=True)
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -12,6 +12,8 @@ class ChatResponse(BaseModel):
     processing_time: Optional[float] = None
     timestamp: Optional[str] = None
     error: Optional[str] = None
+    # Generation details, e.g. num_ctx and prompt tokens served from the KV cache
+    metadata: Optional[Dict[str, Any]] = None
 
 class OllamaStatus(BaseModel):
     status: str
@@ -0,0 +1,8 @@
+from typing import Any, Dict, List
+from pydantic import BaseModel
+
+class TemplateRenderRequest(BaseModel):
+    values: Dict[str, Any]
+
+class TemplateRenderBatchRequest(BaseModel):
+    items: List[Dict[str, Any]]
@@ -0,0 +1,104 @@
+"""
+Document change events between workers over Postgres LISTEN/NOTIFY.
+
+Writers queue a NOTIFY in the same transaction as their change, so events are
+delivered exactly when (and only if) the change commits. Every worker keeps
+one dedicated connection listening on DOCUMENT_CHANNEL and applies other
+workers' changes to its own index and caches.
+"""
+import asyncio
+import json
+import uuid
+from contextlib import suppress
+from typing import TYPE_CHECKING, Dict, Iterable, List, Tuple
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    from app.services.document_service import DocumentService
+
+DOCUMENT_CHANNEL = "document_changes"
+# NOTIFY payloads are limited to 8000 bytes; a quoted UUID takes 39
+MAX_IDS_PER_EVENT = 90
+# Lets a worker skip the events it published itself
+WORKER_ID = uuid.uuid4().hex
+
+def notify_enabled(db: Session) -> bool:
+    return settings.DOCUMENT_NOTIFY_ENABLED and db.bind.dialect.name == "postgresql"
+
+async def publish_changes(db: Session, upserted: Iterable[uuid.UUID] = (), deleted: Iterable[uuid.UUID] = ()) -> None:
+    """Queue change events in db's current transaction; they are sent on commit"""
+    if not notify_enabled(db):
+        return
+    upserted = [str(doc_id) for doc_id in upserted]
+    deleted = [str(doc_id) for doc_id in deleted]
+    for start in range(0, max(len(upserted), len(deleted)), MAX_IDS_PER_EVENT):
+        payload = json.dumps({
+            "origin": WORKER_ID,
+            "upserted": upserted[start:start + MAX_IDS_PER_EVENT],
+            "deleted": deleted[start:start + MAX_IDS_PER_EVENT],
+        })
+        await db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": DOCUMENT_CHANNEL, "payload": payload})
+
+def coalesce_events(payloads: Iterable[str]) -> Tuple[List[uuid.UUID], List[uuid.UUID]]:
+    """
+    Merge event payloads, in order, into (upserted, deleted) ids.
+    The last event for an id wins; this worker's own events are skipped.
+    """
+    latest: Dict[uuid.UUID, bool] = {}
+    for payload in payloads:
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            print(f"Warning: ignoring malformed document event: {payload[:200]}")
+            continue
+        if event.get("origin") == WORKER_ID:
+            continue
+        for doc_id in event.get("deleted", []):
+            latest[uuid.UUID(doc_id)] = False
+        for doc_id in event.get("upserted", []):
+            latest[uuid.UUID(doc_id)] = True
+    upserted = [doc_id for doc_id, exists in latest.items() if exists]
+    deleted = [doc_id for doc_id, exists in latest.items() if not exists]
+    return upserted, deleted
+
+async def listen_for_changes(document_service: "DocumentService") -> None:
+    """
+    Apply other workers' document changes until cancelled, reconnecting on errors.
+    While connected the service stops polling the table for new rows; after
+    each (re)connect it catches up once on anything missed in between.
+    """
+    import asyncpg
+
+    while True:
+        conn = None
+        try:
+            conn = await asyncpg.connect(settings.DATABASE_URI)
+            queue: asyncio.Queue = asyncio.Queue()
+            await conn.add_listener(DOCUMENT_CHANNEL, lambda _conn, _pid, _channel, payload: queue.put_nowait(payload))
+            await document_service.catch_up()
+            document_service.listening = True
+
+            while not conn.is_closed():
+                try:
+                    payloads = [await asyncio.wait_for(queue.get(), timeout=settings.DOCUMENT_NOTIFY_RETRY_SECONDS)]
+                except asyncio.TimeoutError:
+                    continue
+                while not queue.empty():
+                    payloads.append(queue.get_nowait())
+                upserted, deleted = coalesce_events(payloads)
+                if upserted or deleted:
+                    await document_service.apply_changes(upserted, deleted)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Document change listener error: {e}")
+        finally:
+            document_service.listening = False
+            if conn is not None:
+                with suppress(Exception):
+                    await conn.close()
+        await asyncio.sleep(settings.DOCUMENT_NOTIFY_RETRY_SECONDS)
@@ -1,18 +1,45 @@
-from typing import List, Optional
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import delete, insert
 from sqlmodel import Session, select
+from app.core.cache import TTLCache
+from app.core.config import settings
 from app.models.document import Document
-from app.services.ollama_service import ollama_service
-import numpy as np
+from app.services.document_events import publish_changes
+from app.services.ollama_service import get_ollama_service, truncate_embedding
+
+# The numpy-backed index is imported on first retrieval, not with the app
+if TYPE_CHECKING:
+    from app.services.vector_index import MmapVectorIndex, VectorIndex
+
+# Rows committed by other workers may carry an updated_at slightly older than
+# the last refresh, so each refresh looks back a little further
+INDEX_REFRESH_OVERLAP = timedelta(seconds=30)
+INDEX_LOAD_BATCH_SIZE = 5000
 
 class DocumentService:
     def __init__(self):
-        pass
+        self.index: Optional["VectorIndex"] = None
+        self._index_lock = asyncio.Lock()
+        self._index_watermark: Optional[datetime] = None
+        self._index_checked_at = 0.0
+        self._rebuild_task: Optional[asyncio.Task] = None
+        # Set while change events from other workers are being received, which
+        # replaces polling the table for their rows
+        self.listening = False
+        # Hot chunks by id, so repeated winners skip the second query
+        self.content_cache: TTLCache[Document] = TTLCache(max_size=settings.CONTENT_CACHE_SIZE)
 
     async def create_document(self, db: Session, title: str, content: str, document_type: str, source_url: Optional[str] = None):
         """Create a new document and generate its embedding"""
         
         # Generate embedding
-        embedding = ollama_service.get_embeddings(content)
+        embedding = get_ollama_service().get_embeddings(content)
         
         db_document = Document(
             title=title,
@@ -23,10 +50,176 @@ class DocumentService:
         )
         
         db.add(db_document)
+        await publish_changes(db, upserted=[db_document.id])
         await db.commit()
         await db.refresh(db_document)
+
+        if self.index is not None and embedding:
+            self.index.add([db_document.id], [embedding])
         return db_document
 
+    async def _embed_batches(self, texts: Sequence[str], batch_size: Optional[int] = None) -> List[List[float]]:
+        """Embeddings for texts, batch_size texts per Ollama request"""
+        batch_size = batch_size or settings.DOCUMENT_BATCH_SIZE
+        embeddings: List[List[float]] = []
+        for start in range(0, len(texts), batch_size):
+            embeddings.extend(await asyncio.to_thread(
+                get_ollama_service().get_embeddings_batch, list(texts[start:start + batch_size])
+            ))
+        return embeddings
+
+    def _update_index(self, removed: Sequence[uuid.UUID] = (), added: Sequence[Tuple[uuid.UUID, List[float]]] = ()) -> None:
+        """Apply committed changes to the loaded index and drop stale cached rows"""
+        for doc_id in removed:
+            self.content_cache.invalidate(doc_id)
+        for doc_id, _ in added:
+            self.content_cache.invalidate(doc_id)
+        if self.index is None:
+            return
+        if removed:
+            self.index.remove(removed)
+        if added:
+            self.index.add([doc_id for doc_id, _ in added], [embedding for _, embedding in added])
+
+    async def create_documents_batch(self, db: Session, docs: Sequence[Dict[str, Any]]) -> List[Optional[uuid.UUID]]:
+        """
+        Embed and insert several documents with one embedding request and one commit.
+        Returns the new id for each input, or None where no embedding could be generated.
+        """
+        embeddings = await self._embed_batches([doc["content"] for doc in docs], batch_size=len(docs))
+        now = datetime.utcnow()
+        rows = []
+        ids: List[Optional[uuid.UUID]] = []
+        for doc, embedding in zip(docs, embeddings):
+            if not embedding:
+                ids.append(None)
+                continue
+            # Column defaults are Python-side, so a bulk insert sets them itself
+            row = {**doc, "id": uuid.uuid4(), "embedding_vector": embedding, "created_at": now, "updated_at": now}
+            rows.append(row)
+            ids.append(row["id"])
+
+        if rows:
+            await db.execute(insert(Document), rows)
+            await publish_changes(db, upserted=[row["id"] for row in rows])
+            await db.commit()
+            self._update_index(added=[(row["id"], row["embedding_vector"]) for row in rows])
+        return ids
+
+    async def update_document(self, db: Session, document_id: uuid.UUID, changes: Dict[str, Any]) -> Optional[Document]:
+        """Update fields of one document; it is only re-embedded when its content changed"""
+        doc = await db.get(Document, document_id)
+        if doc is None:
+            return None
+
+        reembed = "content" in changes and changes["content"] != doc.content
+        if reembed:
+            embedding = await asyncio.to_thread(get_ollama_service().get_embeddings, changes["content"])
+            if not embedding:
+                raise ValueError("Failed to generate embedding")
+            doc.embedding_vector = embedding
+        for field, value in changes.items():
+            setattr(doc, field, value)
+        doc.updated_at = datetime.utcnow()
+        await publish_changes(db, upserted=[doc.id])
+        await db.commit()
+        await db.refresh(doc)
+
+        self._update_index(added=[(doc.id, doc.embedding_vector)] if reembed else ())
+        self.content_cache.invalidate(doc.id)
+        return doc
+
+    async def delete_document(self, db: Session, document_id: uuid.UUID) -> bool:
+        result = await db.execute(delete(Document).where(Document.id == document_id))
+        await publish_changes(db, deleted=[document_id])
+        await db.commit()
+        if not result.rowcount:
+            return False
+        self._update_index(removed=[document_id])
+        return True
+
+    async def replace_source(
+        self,
+        db: Session,
+        source_url: str,
+        title: str,
+        content: str,
+        document_type: str,
+        batch_size: Optional[int] = None,
+    ) -> Dict[str, int]:
+        """
+        Make the chunks stored for source_url match content, in one transaction.
+        Chunks whose text is unchanged keep their row and embedding (titles are
+        renumbered in place); only new text is embedded and stale chunks are deleted.
+        """
+        result = await db.execute(select(Document).where(Document.source_url == source_url))
+        existing: Dict[str, List[Document]] = {}
+        stale: List[Document] = []
+        for doc in result.scalars().all():
+            if doc.embedding_vector:
+                existing.setdefault(doc.content, []).append(doc)
+            else:
+                stale.append(doc)
+
+        now = datetime.utcnow()
+        kept = []
+        new_rows = []
+        for i, chunk in enumerate(self.split_text(content)):
+            chunk_title = f"{title} (Part {i+1})"
+            matches = existing.get(chunk)
+            if matches:
+                doc = matches.pop()
+                if doc.title != chunk_title or doc.document_type != document_type:
+                    doc.title = chunk_title
+                    doc.document_type = document_type
+                    doc.updated_at = now
+                kept.append(doc)
+            else:
+                new_rows.append({
+                    "id": uuid.uuid4(),
+                    "title": chunk_title,
+                    "content": chunk,
+                    "document_type": document_type,
+                    "source_url": source_url,
+                    "created_at": now,
+                    "updated_at": now,
+                })
+        stale.extend(doc for docs in existing.values() for doc in docs)
+
+        embeddings = await self._embed_batches([row["content"] for row in new_rows], batch_size)
+        if not all(embeddings):
+            raise ValueError(f"Failed to generate embeddings for {source_url}")
+        for row, embedding in zip(new_rows, embeddings):
+            row["embedding_vector"] = embedding
+
+        stale_ids = [doc.id for doc in stale]
+        if stale_ids:
+            await db.execute(delete(Document).where(Document.id.in_(stale_ids)))
+        if new_rows:
+            await db.execute(insert(Document), new_rows)
+        await publish_changes(
+            db,
+            upserted=[row["id"] for row in new_rows] + [doc.id for doc in kept if doc.updated_at == now],
+            deleted=stale_ids,
+        )
+        await db.commit()
+
+        self._update_index(removed=stale_ids, added=[(row["id"], row["embedding_vector"]) for row in new_rows])
+        for doc in kept:
+            self.content_cache.invalidate(doc.id)
+        return {"kept": len(kept), "added": len(new_rows), "removed": len(stale_ids)}
+
+    async def delete_source(self, db: Session, source_url: str) -> int:
+        """Delete every chunk of source_url; returns how many were removed"""
+        result = await db.execute(select(Document.id).where(Document.source_url == source_url))
+        ids = list(result.scalars().all())
+        if ids:
+            await db.execute(delete(Document).where(Document.id.in_(ids)))
+            await publish_changes(db, deleted=ids)
+            await db.commit()
+            self._update_index(removed=ids)
+        return len(ids)
+
     def split_text(self, text: str, chunk_size: int = 1000, overlap: int = 100) -> List[str]:
         """Split text into chunks with overlap"""
         if not text:
@@ -64,7 +257,9 @@ class DocumentService:
         """Calculate cosine similarity between two vectors"""
         if not v1 or not v2:
             return 0.0
-        
+
+        import numpy as np
+
         a = np.array(v1)
         b = np.array(v2)
         
@@ -76,43 +271,301 @@ class DocumentService:
             
         return np.dot(a, b) / (norm_a * norm_b)
 
-    async def search_relevant_documents(self, db: Session, query: str, k: int = 3) -> List[Document]:
-        """Search for relevant documents using vector similarity"""
-        
-        # 1. Generate query embedding
-        query_embedding = ollama_service.get_embeddings(query)
+    def invalidate_index(self) -> None:
+        """Drop the in-memory index; the next search rebuilds it"""
+        self.index = None
+        self._index_watermark = None
+
+    async def _scan_embeddings(
+        self,
+        db: Session,
+        since: Optional[datetime] = None,
+        base: Optional["MmapVectorIndex"] = None,
+    ) -> Tuple["VectorIndex", Optional[datetime]]:
+        """
+        Build an index from (id, embedding) only, without content or titles.
+        Rows already in base's file and not updated after its watermark are
+        skipped, so the refresh overlap does not copy them into the overlay.
+        """
+        from app.services.vector_index import VectorIndex
+
+        statement = select(Document.id, Document.embedding_vector, Document.updated_at).where(
+            Document.embedding_vector != None
+        )
+        if since is not None:
+            statement = statement.where(Document.updated_at > since)
+
+        # Rows embedded before EMBEDDING_DIMENSIONS was set are truncated on load
+        dimensions = settings.EMBEDDING_DIMENSIONS
+        index = None
+        watermark = since
+        result = await db.stream(statement.execution_options(yield_per=INDEX_LOAD_BATCH_SIZE))
+        async for rows in result.partitions():
+            newest = max(row[2] for row in rows)
+            watermark = newest if watermark is None else max(watermark, newest)
+            if base is not None and base.watermark is not None:
+                in_file = base.in_base([row[0] for row in rows])
+                rows = [row for row, stored in zip(rows, in_file) if not (stored and row[2] <= base.watermark)]
+            if index is None:
+                index = VectorIndex.from_rows((row[0], truncate_embedding(row[1], dimensions)) for row in rows)
+            else:
+                batch = VectorIndex.from_rows((row[0], truncate_embedding(row[1], dimensions)) for row in rows)
+                if len(batch):
+                    index.add(batch.ids, batch.matrix)
+        return index or VectorIndex(dim=0), watermark
+
+    def _open_index_file(self) -> Optional["MmapVectorIndex"]:
+        """Map the shared index file if it exists and matches the embedding model"""
+        from app.services.vector_index import MmapVectorIndex
+
+        path = settings.VECTOR_INDEX_PATH
+        if not os.path.exists(path):
+            return None
+        try:
+            index = MmapVectorIndex(path)
+        except (OSError, ValueError) as e:
+            print(f"Warning: ignoring unreadable vector index {path}: {e}")
+            return None
+        if index.model != settings.OLLAMA_EMBEDDING_MODEL:
+            print(f"Vector index {path} was built with {index.model}, rebuilding")
+            return None
+        if index.dimensions != settings.EMBEDDING_DIMENSIONS:
+            print(f"Vector index {path} was built with dimensions={index.dimensions}, rebuilding")
+            return None
+        return index
+
+    async def rebuild_index_file(self, db: Session) -> None:
+        """Write a fresh shared index file from the documents table"""
+        from app.services.vector_index import write_index_file
+
+        index, watermark = await self._scan_embeddings(db)
+        await asyncio.to_thread(
+            write_index_file,
+            settings.VECTOR_INDEX_PATH,
+            index.ids,
+            index.matrix,
+            settings.OLLAMA_EMBEDDING_MODEL,
+            watermark,
+            settings.EMBEDDING_DIMENSIONS,
+        )
+
+    async def _load_index(self, db: Session) -> None:
+        from app.services.vector_index import index_file_lock
+
+        path = settings.VECTOR_INDEX_PATH
+        if not path:
+            self.index, self._index_watermark = await self._scan_embeddings(db)
+            return
+
+        index = self._open_index_file()
+        if index is None:
+            async with index_file_lock(path):
+                # Another worker may have built it while we waited
+                index = self._open_index_file()
+                if index is None:
+                    await self.rebuild_index_file(db)
+                    index = self._open_index_file()
+        if index is None:
+            self.index, self._index_watermark = await self._scan_embeddings(db)
+            return
+
+        self.index = index
+        self._index_watermark = index.watermark
+        await self._refresh_index(db)
+
+    async def _refresh_index(self, db: Session) -> None:
+        """Pick up rows written since the last refresh (possibly by other workers)"""
+        from app.services.vector_index import MmapVectorIndex
+
+        since = self._index_watermark - INDEX_REFRESH_OVERLAP if self._index_watermark else None
+        base = self.index if isinstance(self.index, MmapVectorIndex) else None
+        fresh, watermark = await self._scan_embeddings(db, since, base)
+        if len(fresh):
+            # Rows edited elsewhere may be cached with their old title and content
+            self._update_index(added=list(zip(fresh.ids, fresh.matrix)))
+        self._index_watermark = watermark or self._index_watermark
+        await self._prune_deleted(db)
+
+    async def _prune_deleted(self, db: Session) -> None:
+        """
+        Remove indexed ids whose rows were deleted without a change event; the
+        watermark scan only finds upserts. Reads ids only, never embeddings.
+        """
+        live = set()
+        statement = select(Document.id).where(Document.embedding_vector != None)
+        result = await db.stream(statement.execution_options(yield_per=INDEX_LOAD_BATCH_SIZE))
+        async for rows in result.partitions():
+            live.update(row[0] for row in rows)
+        stale = self.index.stale_ids(live)
+        if stale:
+            # Rows this worker committed and indexed after the id scan are still live
+            result = await db.execute(select(Document.id).where(Document.id.in_(stale), Document.embedding_vector != None))
+            committed = set(result.scalars().all())
+            self._update_index(removed=[doc_id for doc_id in stale if doc_id not in committed])
+
+    def _schedule_rebuild(self) -> None:
+        """Start a background rebuild once the overlay holds too much of the index"""
+        from app.services.vector_index import MmapVectorIndex
+
+        index = self.index
+        if (
+            isinstance(index, MmapVectorIndex)
+            and len(index.overlay) > max(settings.INDEX_REBUILD_MIN_ROWS, settings.INDEX_REBUILD_RATIO * index.count)
+            and (self._rebuild_task is None or self._rebuild_task.done())
+        ):
+            self._rebuild_task = asyncio.create_task(self._rebuild_in_background(index.identity))
+
+    async def _rebuild_in_background(self, identity) -> None:
+        """Fold the overlay into a new index file; workers switch on their next refresh"""
+        from app.db.session import async_session
+        from app.services.vector_index import file_identity, index_file_lock
+
+        path = settings.VECTOR_INDEX_PATH
+        try:
+            async with index_file_lock(path):
+                if file_identity(path) != identity:
+                    return  # already rebuilt by another worker
+                async with async_session() as db:
+                    await self.rebuild_index_file(db)
+        except Exception as e:
+            print(f"Error rebuilding vector index: {e}")
+
+    async def _get_index(self, db: Session) -> "VectorIndex":
+        """Load the index on first use, then periodically refresh it or switch to a rebuilt file"""
+        from app.services.vector_index import MmapVectorIndex, file_identity
+
+        if self.index is not None and time.monotonic() - self._index_checked_at < settings.INDEX_REFRESH_SECONDS:
+            return self.index
+
+        async with self._index_lock:
+            if time.monotonic() - self._index_checked_at >= settings.INDEX_REFRESH_SECONDS or self.index is None:
+                replaced = (
+                    isinstance(self.index, MmapVectorIndex)
+                    and file_identity(self.index.path) != self.index.identity
+                )
+                if self.index is None or replaced:
+                    await self._load_index(db)
+                elif not self.listening:
+                    await self._refresh_index(db)
+                self._schedule_rebuild()
+                self._index_checked_at = time.monotonic()
+        return self.index
+
+    async def apply_changes(self, upserted: Sequence[uuid.UUID], deleted: Sequence[uuid.UUID]) -> None:
+        """Apply documents committed by another worker to the index and caches"""
+        from app.db.session import async_session
+
+        async with self._index_lock:
+            found: Dict[uuid.UUID, List[float]] = {}
+            if upserted and self.index is not None:
+                async with async_session() as db:
+                    result = await db.execute(
+                        select(Document.id, Document.embedding_vector).where(Document.id.in_(upserted))
+                    )
+                    found = {
+                        doc_id: truncate_embedding(embedding, settings.EMBEDDING_DIMENSIONS)
+                        for doc_id, embedding in result.all()
+                        if embedding
+                    }
+            # Rows gone again by the time we read them count as deleted
+            removed = list(deleted) + [doc_id for doc_id in upserted if doc_id not in found]
+            for doc_id in upserted:
+                self.content_cache.invalidate(doc_id)
+            self._update_index(removed=removed, added=list(found.items()))
+
+    async def catch_up(self) -> None:
+        """Poll once for rows written while change events were not being received"""
+        from app.db.session import async_session
+
+        async with self._index_lock:
+            if self.index is None or settings.RETRIEVAL_MODE != "index":
+                return
+            async with async_session() as db:
+                await self._refresh_index(db)
+            # Rows cached before the gap may have changed since
+            self.content_cache.clear()
+
+    async def load_index(self, db: Session) -> "VectorIndex":
+        """Load the index ahead of the first search (used at startup)"""
+        return await self._get_index(db)
+
+    async def prefetch_index(self) -> None:
+        """
+        Load or refresh the index on a session of its own, so it can overlap
+        other request work (and finish for later requests if this one stops
+        waiting). Errors are left for the search itself to surface.
+        """
+        from app.db.session import async_session
+
+        try:
+            async with async_session() as db:
+                await self._get_index(db)
+        except Exception as e:
+            print(f"Error prefetching vector index: {e}")
+
+    async def _fetch_documents(self, db: Session, ids: Sequence[uuid.UUID]) -> Dict[uuid.UUID, Document]:
+        """Full rows for the winning ids, served from the content cache when hot"""
+        found = {}
+        missing = []
+        for doc_id in ids:
+            doc = self.content_cache.get(doc_id)
+            if doc is None:
+                missing.append(doc_id)
+            else:
+                found[doc_id] = doc
+
+        if missing:
+            result = await db.execute(select(Document).where(Document.id.in_(missing)))
+            for doc in result.scalars().all():
+                self.content_cache.set(doc.id, doc)
+                found[doc.id] = doc
+        return found
+
+    def _diversify(self, index: "VectorIndex", query_embedding: List[float], hits: List[Tuple[uuid.UUID, float]], k: int) -> List[Tuple[uuid.UUID, float]]:
+        """Pick k of the candidate hits by maximal marginal relevance"""
+        from app.services.rerank import mmr
+        from app.services.vector_index import normalize
+
+        # Drop hits removed from the index since they were scored
+        hits = [hit for hit in hits if hit[0] in index]
+        if len(hits) <= 1:
+            return hits[:k]
+        candidates = index.vectors([doc_id for doc_id, _ in hits])
+        order = mmr(normalize(query_embedding), candidates, k, settings.MMR_LAMBDA)
+        return [hits[i] for i in order]
+
+    def _score(self, index: "VectorIndex", query_embedding: List[float], k: int) -> List[Tuple[uuid.UUID, float]]:
+        """Top-k (id, score) pairs; runs in a worker thread so a large scan does not block the event loop"""
+        if settings.MMR_LAMBDA < 1.0:
+            candidates = index.search(query_embedding, max(k, settings.MMR_CANDIDATES), shards=settings.SEARCH_SHARDS)
+            return self._diversify(index, query_embedding, candidates, k)
+        return index.search(query_embedding, k, shards=settings.SEARCH_SHARDS)
+
+    async def search_by_embedding(self, db: Session, query_embedding: List[float], k: int = 3) -> List[Tuple[float, Document]]:
+        """Top-k (score, document) pairs for an already computed query embedding"""
         if not query_embedding:
             return []
-            
-        # 2. Fetch all documents with embeddings
-        # In a production w/ pgvector, we would do this in SQL
-        statement = select(Document).where(Document.embedding_vector != None)
-        result = await db.execute(statement)
-        documents = result.scalars().all()
-        
-        if not documents:
-            return []
-            
-        # 3. Calculate similarity
-        scored_docs = []
-        for doc in documents:
-            if not doc.embedding_vector:
-                continue
-                
-            # Ensure vector is list of floats
-            try:
-                # If stored as JSON, it might be a list already
-                doc_vector = doc.embedding_vector
-                score = self.cosine_similarity(query_embedding, doc_vector)
-                scored_docs.append((score, doc))
-            except Exception as e:
-                print(f"Error calculating similarity for doc {doc.id}: {e}")
-                continue
-        
-        # 4. Sort and return top k
-        scored_docs.sort(key=lambda x: x[0], reverse=True)
-        
+        query_embedding = truncate_embedding(query_embedding, settings.EMBEDDING_DIMENSIONS)
+
+        # Phase 1: score ids using only the embeddings
+        if settings.RETRIEVAL_MODE == "scan":
+            index, _ = await self._scan_embeddings(db)
+        else:
+            index = await self._get_index(db)
+        hits = await asyncio.to_thread(self._score, index, query_embedding, k)
+
+        # Phase 2: load full rows for the winners only
+        docs = await self._fetch_documents(db, [doc_id for doc_id, _ in hits])
+        return [(score, docs[doc_id]) for doc_id, score in hits if doc_id in docs]
+
+    async def search_relevant_documents(self, db: Session, query: str, k: int = 3) -> List[Document]:
+        """Search for relevant documents using vector similarity"""
+        query_embedding = get_ollama_service().get_embeddings(query)
+        scored_docs = await self.search_by_embedding(db, query_embedding, k)
         # Filter by threshold if needed (e.g. > 0.5)
-        return [doc for score, doc in scored_docs[:k]]
+        return [doc for score, doc in scored_docs]
 
-document_service = DocumentService()
+@lru_cache()
+def get_document_service() -> DocumentService:
+    """Shared instance, built on first use"""
+    return DocumentService()
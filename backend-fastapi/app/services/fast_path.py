@@ -0,0 +1,77 @@
+"""
+Extractive answers for curated FAQ chunks.
+
+When the best retrieved chunk is a curated answer (document_type in
+CHAT_FAST_PATH_DOCUMENT_TYPES) and its similarity reaches
+CHAT_FAST_PATH_MIN_SCORE, /chat/ returns the answer text from the chunk
+instead of having the LLM paraphrase it.
+"""
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import Counter
+from app.models.document import Document
+
+decisions = Counter("chat_fast_path_total", "Chat requests by extractive fast-path decision", ["decision"])
+saved = Counter("chat_fast_path_saved_seconds_total", "Estimated LLM generation time skipped by extractive answers")
+
+# "P: ... R: ...", "Pregunta: ... Respuesta: ...", "Q: ... A: ..." and the
+# Portuguese forms; the answer is everything after the answer label
+ANSWER_LABEL = re.compile(r"^\s*(?:R|A|Respuesta|Resposta|Answer)\s*:\s*", re.IGNORECASE | re.MULTILINE)
+SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+@dataclass
+class FastPathDecision:
+    # "extractive", or why generation was still needed
+    decision: str
+    score: Optional[float] = None
+    answer: Optional[str] = None
+    document: Optional[Document] = None
+
+    def metadata(self) -> Dict[str, Any]:
+        return {"decision": self.decision, "score": round(self.score, 4) if self.score is not None else None}
+
+def extract_answer(content: str, max_chars: int) -> str:
+    """
+    The answer part of a question/answer chunk (or the whole chunk), cut at
+    the last sentence end within max_chars.
+    """
+    match = ANSWER_LABEL.search(content)
+    answer = content[match.end():] if match else content
+    answer = answer.strip()
+    if len(answer) <= max_chars:
+        return answer
+    head = answer[:max_chars]
+    ends = [m.start() for m in SENTENCE_END.finditer(head + " ")]
+    return head[:ends[-1]].strip() if ends else head.rstrip() + "…"
+
+def decide(hits: List[Tuple[float, Document]]) -> FastPathDecision:
+    """Whether the top hit can be returned as the answer"""
+    if not settings.CHAT_FAST_PATH_ENABLED:
+        result = FastPathDecision("disabled")
+    elif not hits:
+        result = FastPathDecision("no_match")
+    else:
+        score, doc = max(hits, key=lambda hit: hit[0])
+        if doc.document_type not in settings.CHAT_FAST_PATH_DOCUMENT_TYPES:
+            result = FastPathDecision("not_curated", score)
+        elif score < settings.CHAT_FAST_PATH_MIN_SCORE:
+            result = FastPathDecision("below_threshold", score)
+        else:
+            answer = extract_answer(doc.content, settings.CHAT_FAST_PATH_MAX_CHARS)
+            result = FastPathDecision("extractive" if answer else "empty_answer", score, answer or None, doc)
+    decisions.inc(decision=result.decision)
+    return result
+
+def extractive_response(result: FastPathDecision, average_chat_seconds: Optional[float]) -> Dict[str, Any]:
+    """A chat response built from the matched chunk, shaped like OllamaService.chat's"""
+    saved_seconds = average_chat_seconds or 0.0
+    saved.inc(saved_seconds)
+    return {
+        "message": result.answer,
+        "sources": [result.document.title],
+        "model_used": "extractive",
+        "metadata": {"generation_saved_ms": round(saved_seconds * 1000, 1)},
+    }
@@ -0,0 +1,155 @@
+"""
+Weighted fair queueing in front of the LLM.
+
+Each user is a flow. A request gets a virtual finish tag of
+max(virtual clock, the user's previous tag) + 1 / weight, and free slots go
+to the queued request with the smallest tag whose user is under
+LLM_USER_MAX_CONCURRENCY. A user submitting many requests only pushes their
+own tags further out, so other users' requests overtake them, and premium
+users (weight LLM_PREMIUM_WEIGHT) advance their tags more slowly and get a
+proportionally larger share of the model under contention.
+"""
+import asyncio
+import itertools
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import AsyncIterator, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.metrics import Counter, Gauge, Histogram
+
+queue_depth = Gauge("llm_queue_depth", "Chat requests waiting for an LLM slot", ["lane"])
+running = Gauge("llm_running", "Chat requests currently using an LLM slot", ["lane"])
+queue_position = Histogram(
+    "llm_queue_position", "Requests ahead of a chat request when it was queued", ["lane"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100),
+)
+queue_wait = Histogram("llm_queue_wait_seconds", "Time chat requests waited for an LLM slot", ["lane"])
+rejected = Counter("llm_rejected_total", "Chat requests rejected because the queue was full or timed out", ["lane", "reason"])
+
+class QueueFull(Exception):
+    pass
+
+class QueueTimeout(Exception):
+    pass
+
+@dataclass
+class Ticket:
+    """A request's place in the scheduler, returned to the caller for headers"""
+    user: str
+    lane: str
+    start: float
+    tag: float
+    sequence: int
+    position: int = 0
+    enqueued_at: float = field(default_factory=time.monotonic)
+    wait_seconds: float = 0.0
+    granted: Optional[asyncio.Future] = None
+
+class LLMScheduler:
+    def __init__(
+        self,
+        capacity: int,
+        premium_weight: float,
+        user_max_concurrency: int,
+        max_queue: int,
+    ):
+        self.capacity = capacity
+        self.premium_weight = premium_weight
+        self.user_max_concurrency = user_max_concurrency
+        self.max_queue = max_queue
+        self.virtual_time = 0.0
+        self.queue: List[Ticket] = []
+        self._last_tag: Dict[str, float] = {}
+        self._running: Dict[str, int] = {}
+        self._sequence = itertools.count()
+
+    @property
+    def running_count(self) -> int:
+        return sum(self._running.values())
+
+    def _enqueue(self, user: str, premium: bool) -> Ticket:
+        lane = "premium" if premium else "standard"
+        if len(self.queue) >= self.max_queue:
+            rejected.inc(lane=lane, reason="queue_full")
+            raise QueueFull(f"LLM queue is full ({self.max_queue} waiting)")
+
+        weight = self.premium_weight if premium else 1.0
+        start = max(self.virtual_time, self._last_tag.get(user, 0.0))
+        tag = start + 1.0 / weight
+        self._last_tag[user] = tag
+        ticket = Ticket(user=user, lane=lane, start=start, tag=tag, sequence=next(self._sequence))
+        ticket.granted = asyncio.get_running_loop().create_future()
+        ticket.position = sum(1 for queued in self.queue if (queued.tag, queued.sequence) < (tag, ticket.sequence))
+        self.queue.append(ticket)
+        queue_depth.inc(lane=lane)
+        queue_position.observe(ticket.position, lane=lane)
+        self._dispatch()
+        return ticket
+
+    def _dispatch(self) -> None:
+        """Grant free slots to the eligible queued tickets with the smallest tags"""
+        while self.running_count < self.capacity:
+            eligible = [t for t in self.queue if self._running.get(t.user, 0) < self.user_max_concurrency]
+            if not eligible:
+                return
+            ticket = min(eligible, key=lambda t: (t.tag, t.sequence))
+            self.queue.remove(ticket)
+            queue_depth.dec(lane=ticket.lane)
+            self.virtual_time = max(self.virtual_time, ticket.start)
+            self._running[ticket.user] = self._running.get(ticket.user, 0) + 1
+            running.inc(lane=ticket.lane)
+            ticket.wait_seconds = time.monotonic() - ticket.enqueued_at
+            queue_wait.observe(ticket.wait_seconds, lane=ticket.lane)
+            ticket.granted.set_result(True)
+
+    def _release(self, ticket: Ticket) -> None:
+        self._running[ticket.user] -= 1
+        if not self._running[ticket.user]:
+            del self._running[ticket.user]
+        running.dec(lane=ticket.lane)
+        if not self._running and not self.queue:
+            # Idle: forget old tags so the clock does not grow without bound
+            self._last_tag.clear()
+            self.virtual_time = 0.0
+        self._dispatch()
+
+    def _abandon(self, ticket: Ticket) -> None:
+        if ticket in self.queue:
+            self.queue.remove(ticket)
+            queue_depth.dec(lane=ticket.lane)
+
+    @asynccontextmanager
+    async def slot(self, user: str, premium: bool = False, timeout: Optional[float] = None) -> AsyncIterator[Ticket]:
+        """Wait for an LLM slot for user; raises QueueFull or QueueTimeout"""
+        ticket = self._enqueue(user, premium)
+        try:
+            await asyncio.wait_for(asyncio.shield(ticket.granted), timeout)
+        except asyncio.TimeoutError:
+            self._abandon(ticket)
+            if ticket.granted.done():
+                self._release(ticket)
+            rejected.inc(lane=ticket.lane, reason="timeout")
+            raise QueueTimeout(f"No LLM slot within {timeout}s")
+        except BaseException:
+            # Client went away while queued
+            self._abandon(ticket)
+            if ticket.granted.done():
+                self._release(ticket)
+            raise
+        try:
+            yield ticket
+        finally:
+            self._release(ticket)
+
+@lru_cache()
+def get_llm_scheduler() -> LLMScheduler:
+    """Shared by all chat requests of this worker process"""
+    return LLMScheduler(
+        capacity=settings.LLM_MAX_CONCURRENCY,
+        premium_weight=settings.LLM_PREMIUM_WEIGHT,
+        user_max_concurrency=settings.LLM_USER_MAX_CONCURRENCY,
+        max_queue=settings.LLM_MAX_QUEUE,
+    )
@@ -1,11 +1,33 @@
-import ollama
-from typing import Dict, List, Any
+import asyncio
+import math
+import time
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Tuple
 from app.core.config import settings
+from app.core.metrics import Counter
+
+prompt_tokens_evaluated = Counter("llm_prompt_tokens_evaluated_total", "Prompt tokens Ollama evaluated")
+prompt_tokens_cached = Counter("llm_prompt_tokens_cached_total", "Estimated prompt tokens served from Ollama's KV cache")
+prompt_eval_saved = Counter("llm_prompt_eval_saved_seconds_total", "Estimated prompt evaluation time saved by the KV cache")
+
+def truncate_embedding(embedding: List[float], dimensions: Optional[int]) -> List[float]:
+    """
+    Matryoshka truncation: keep the first `dimensions` components and
+    renormalize. Embeddings already that short are returned unchanged.
+    """
+    if not dimensions or not embedding or len(embedding) <= dimensions:
+        return embedding
+    head = embedding[:dimensions]
+    norm = math.sqrt(sum(x * x for x in head))
+    return [x / norm for x in head] if norm else head
 
 class OllamaService:
     """Service for interacting with Ollama local LLM"""
     
     def __init__(self):
+        # Imported here so that importing the app does not load the client
+        import ollama
+
         # Ollama client handling
         # standard client relies on OLLAMA_HOST env var by default
         self.host = settings.OLLAMA_HOST
@@ -18,6 +40,9 @@ class OllamaService:
              self.client = None
 
         self.system_prompt = self._get_paraguay_system_prompt()
+        self._prompt_seconds_per_token: Optional[float] = None
+        # Smoothed wall time of a chat generation, to price skipped ones
+        self.average_chat_seconds: Optional[float] = None
     
     def _get_paraguay_system_prompt(self) -> str:
         """Get the system prompt for Paraguay assistant"""
@@ -37,9 +62,102 @@ REGLAS DE IDIOMA:
 
 Sé preciso, útil y amigable."""
 
-    async def chat(self, user_message: str, chat_history: List[Dict[str, str]] = None) -> Dict[str, Any]:
+    def _history_window(self, chat_history: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """
+        The last OLLAMA_HISTORY_MESSAGES messages, with the window start moving
+        in steps of OLLAMA_HISTORY_STEP. Between steps the messages before the
+        new turn are identical to the previous request's, so Ollama can reuse
+        their KV cache instead of re-evaluating them.
+        """
+        step = max(1, settings.OLLAMA_HISTORY_STEP)
+        overflow = max(0, len(chat_history) - settings.OLLAMA_HISTORY_MESSAGES)
+        start = -(-overflow // step) * step
+        return chat_history[start:]
+
+    def build_messages(
+        self,
+        user_message: str,
+        chat_history: Optional[List[Dict[str, str]]] = None,
+        context: Optional[List[Tuple[str, str]]] = None,
+    ) -> List[Dict[str, str]]:
+        """
+        System prompt and history first, as a prefix that stays the same from
+        one request to the next; per-request RAG context goes into the last
+        message only.
+        """
+        messages = [{"role": "system", "content": self.system_prompt}]
+        for msg in self._history_window(chat_history or []):
+            messages.append({
+                "role": msg.get("role", "user"),
+                "content": msg.get("content", "")
+            })
+
+        if context:
+            context_str = "\n\n".join(f"Documento: {title}\n{content}" for title, content in context)
+            user_message = f"""Usa el siguiente contexto para responder la pregunta, si es relevante:
+
+{context_str}
+
+Pregunta del usuario: {user_message}"""
+        messages.append({"role": "user", "content": user_message})
+        return messages
+
+    def estimate_tokens(self, messages: List[Dict[str, str]]) -> int:
+        """Rough prompt size; chat templates add a few tokens per message"""
+        chars = sum(len(msg["content"]) for msg in messages)
+        return int(chars / settings.OLLAMA_CHARS_PER_TOKEN) + 8 * len(messages)
+
+    def num_ctx_for(self, prompt_tokens: int) -> int:
+        """
+        Smallest power-of-two context between OLLAMA_MIN_CTX and OLLAMA_MAX_CTX
+        that fits the prompt plus the reply. Ollama reloads the model when
+        num_ctx changes, so only a few bucket sizes are ever used.
+        """
+        needed = prompt_tokens + settings.OLLAMA_NUM_PREDICT
+        num_ctx = settings.OLLAMA_MIN_CTX
+        while num_ctx < needed and num_ctx < settings.OLLAMA_MAX_CTX:
+            num_ctx *= 2
+        return min(num_ctx, settings.OLLAMA_MAX_CTX)
+
+    def _prompt_stats(self, response: Dict[str, Any], prompt_tokens: int, num_ctx: int) -> Dict[str, Any]:
         """
-        Send a chat message to Ollama and get response
+        Prompt evaluation figures for one response. Ollama only counts tokens
+        it had to evaluate, so the rest of the estimated prompt was served
+        from the KV cache; the time saved is priced at the measured rate.
+        """
+        evaluated = response.get("prompt_eval_count") or 0
+        eval_seconds = (response.get("prompt_eval_duration") or 0) / 1e9
+        if evaluated and eval_seconds:
+            rate = eval_seconds / evaluated
+            # Smoothed seconds per prompt token, for responses that were almost all cached
+            self._prompt_seconds_per_token = (
+                rate if self._prompt_seconds_per_token is None
+                else 0.8 * self._prompt_seconds_per_token + 0.2 * rate
+            )
+        cached = max(0, prompt_tokens - evaluated)
+        saved = cached * (self._prompt_seconds_per_token or 0.0)
+
+        prompt_tokens_evaluated.inc(evaluated)
+        prompt_tokens_cached.inc(cached)
+        prompt_eval_saved.inc(saved)
+        return {
+            "num_ctx": num_ctx,
+            "prompt_tokens_estimate": prompt_tokens,
+            "prompt_eval_count": evaluated,
+            "prompt_eval_ms": round(eval_seconds * 1000, 1),
+            "cached_prompt_tokens": cached,
+            "prompt_eval_saved_ms": round(saved * 1000, 1),
+        }
+
+    async def chat(
+        self,
+        user_message: str,
+        chat_history: List[Dict[str, str]] = None,
+        context: Optional[List[Tuple[str, str]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Send a chat message to Ollama and get response.
+        context is a list of (title, content) documents to answer from.
         """
         if not self.client:
              return {
@@ -48,35 +166,40 @@ Sé preciso, útil y amigable."""
             }
 
         try:
-            # Prepare messages
-            messages = [{"role": "system", "content": self.system_prompt}]
-            
-            if chat_history:
-                for msg in chat_history[-10:]:
-                    messages.append({
-                        "role": msg.get("role", "user"),
-                        "content": msg.get("content", "")
-                    })
-            
-            messages.append({"role": "user", "content": user_message})
-            
-            # Call Ollama (sync for now, as the library is sync)
-            # In a real high-perf scenario, we might want to run this in a threadpool
-            response = self.client.chat(
+            messages = self.build_messages(user_message, chat_history, context)
+            prompt_tokens = self.estimate_tokens(messages)
+            num_ctx = self.num_ctx_for(prompt_tokens)
+            if prompt_tokens + settings.OLLAMA_NUM_PREDICT > num_ctx:
+                print(f"Warning: prompt of ~{prompt_tokens} tokens exceeds num_ctx {num_ctx} and will be truncated")
+
+            # The client is sync; run it in a thread so queued requests and
+            # other endpoints keep being served while the model generates
+            start = time.perf_counter()
+            response = await asyncio.to_thread(
+                self.client.chat,
                 model=self.model,
                 messages=messages,
+                keep_alive=settings.OLLAMA_KEEP_ALIVE,
                 options={
                     'temperature': 0.7,
                     'top_p': 0.9,
+                    'num_ctx': num_ctx,
+                    'num_predict': settings.OLLAMA_NUM_PREDICT,
                 }
             )
             
+            elapsed = time.perf_counter() - start
+            self.average_chat_seconds = (
+                elapsed if self.average_chat_seconds is None
+                else 0.8 * self.average_chat_seconds + 0.2 * elapsed
+            )
             ai_response = response['message']['content']
             
             return {
                 'message': ai_response,
                 'sources': [],
                 'model_used': self.model,
+                'metadata': self._prompt_stats(response, prompt_tokens, num_ctx),
             }
             
         except Exception as e:
@@ -91,11 +214,45 @@ Sé preciso, útil y amigable."""
             return []
         try:
             response = self.client.embeddings(model=self.embedding_model, prompt=text)
-            return response.get('embedding', [])
+            return truncate_embedding(response.get('embedding', []), settings.EMBEDDING_DIMENSIONS)
         except Exception as e:
             print(f"Error generating embeddings: {e}")
             return []
 
+    def get_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for several texts in one request"""
+        if not self.client or not texts:
+            return [[] for _ in texts]
+        # /api/embed takes a list of inputs; older clients only have /api/embeddings
+        if not hasattr(self.client, "embed"):
+            return [self.get_embeddings(text) for text in texts]
+        try:
+            response = self.client.embed(model=self.embedding_model, input=texts)
+            embeddings = list(response.get('embeddings', []))
+            if len(embeddings) != len(texts):
+                raise ValueError(f"expected {len(texts)} embeddings, got {len(embeddings)}")
+            return [truncate_embedding(embedding, settings.EMBEDDING_DIMENSIONS) for embedding in embeddings]
+        except Exception as e:
+            print(f"Error generating batch embeddings: {e}")
+            return [[] for _ in texts]
+
+    def warm_up(self, model: str) -> None:
+        """Load a model into Ollama's memory and keep it resident for OLLAMA_KEEP_ALIVE"""
+        if not self.client:
+            raise RuntimeError(f"Ollama client not initialized for {self.host}")
+        if model == self.embedding_model:
+            self.client.embeddings(model=model, prompt="warm up", keep_alive=settings.OLLAMA_KEEP_ALIVE)
+        else:
+            # Load the model with the smallest num_ctx (a different one would
+            # reload it) and evaluate the system prompt, so the first chats
+            # find the shared prefix in the KV cache
+            self.client.chat(
+                model=model,
+                messages=[{"role": "system", "content": self.system_prompt}],
+                keep_alive=settings.OLLAMA_KEEP_ALIVE,
+                options={'num_ctx': settings.OLLAMA_MIN_CTX, 'num_predict': 1},
+            )
+
     def get_available_models(self) -> List[str]:
         """Get list of available Ollama models"""
         if not self.client:
@@ -119,4 +276,7 @@ Sé preciso, útil y amigable."""
         except Exception:
             return False
 
-ollama_service = OllamaService()
+@lru_cache()
+def get_ollama_service() -> OllamaService:
+    """Shared instance, built on first use"""
+    return OllamaService()
@@ -0,0 +1,93 @@
+"""
+Request pipelines as a small dependency graph of async stages.
+
+Each stage starts as soon as the stages it depends on have finished, so
+independent stages overlap. A stage with a fallback degrades to it on timeout
+or error and the pipeline carries on; a stage without one fails the pipeline,
+cancelling the stages still running.
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from app.core.metrics import Counter, Histogram
+
+stage_duration = Histogram("pipeline_stage_seconds", "Duration of request pipeline stages", ["pipeline", "stage"])
+stage_degraded = Counter(
+    "pipeline_stage_degraded_total", "Pipeline stages that fell back after a timeout or error", ["pipeline", "stage", "reason"]
+)
+
+REQUIRED = object()
+
+class StageTimeout(Exception):
+    pass
+
+@dataclass
+class Stage:
+    """
+    run is called with the results of the stages in `after` as keyword
+    arguments. timeout bounds run itself, not the wait for dependencies.
+    """
+    name: str
+    run: Callable[..., Awaitable[Any]]
+    after: Sequence[str] = ()
+    timeout: Optional[float] = None
+    fallback: Any = REQUIRED
+
+@dataclass
+class StageResults:
+    values: Dict[str, Any] = field(default_factory=dict)
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+    # stage -> "timeout" or "error: ..." for stages that used their fallback
+    degraded: Dict[str, str] = field(default_factory=dict)
+
+async def run_stages(pipeline: str, stages: List[Stage]) -> StageResults:
+    """Run stages (listed after their dependencies) as concurrently as the graph allows"""
+    results = StageResults()
+    tasks: Dict[str, asyncio.Task] = {}
+
+    async def execute(stage: Stage) -> Any:
+        inputs = {name: await tasks[name] for name in stage.after}
+        start = time.perf_counter()
+        try:
+            value = await asyncio.wait_for(stage.run(**inputs), stage.timeout)
+        except asyncio.TimeoutError:
+            if stage.fallback is REQUIRED:
+                raise StageTimeout(f"Stage '{stage.name}' timed out after {stage.timeout}s")
+            results.degraded[stage.name] = "timeout"
+            stage_degraded.inc(pipeline=pipeline, stage=stage.name, reason="timeout")
+            value = stage.fallback
+        except Exception as e:
+            if stage.fallback is REQUIRED:
+                raise
+            print(f"Stage '{stage.name}' of {pipeline} failed, using fallback: {e}")
+            results.degraded[stage.name] = f"error: {e}"
+            stage_degraded.inc(pipeline=pipeline, stage=stage.name, reason="error")
+            value = stage.fallback
+        finally:
+            elapsed = time.perf_counter() - start
+            results.timings_ms[stage.name] = round(elapsed * 1000, 1)
+            stage_duration.observe(elapsed, pipeline=pipeline, stage=stage.name)
+        results.values[stage.name] = value
+        return value
+
+    seen = set()
+    for stage in stages:
+        unknown = [name for name in stage.after if name not in seen]
+        if unknown:
+            raise ValueError(f"Stage '{stage.name}' depends on {unknown}, which are not listed before it")
+        seen.add(stage.name)
+
+    for stage in stages:
+        tasks[stage.name] = asyncio.create_task(execute(stage))
+
+    try:
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        # Let the cancelled stages unwind and retrieve their exceptions
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
+    return results
@@ -0,0 +1,33 @@
+import numpy as np
+
+def mmr(query: np.ndarray, candidates: np.ndarray, k: int, lambda_: float) -> np.ndarray:
+    """
+    Maximal marginal relevance: positions of k candidates, in selection order.
+
+    Each pick maximizes lambda_ * relevance - (1 - lambda_) * (similarity to
+    the closest chunk already picked), so near-duplicates of a chosen chunk
+    lose out to slightly less relevant but different ones. query and
+    candidates must be L2-normalized. All pairwise similarities come from one
+    matrix product; each pick is a vectorized update over the candidate set.
+    """
+    k = min(k, len(candidates))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    relevance = candidates @ query
+    similarity = candidates @ candidates.T
+    redundancy = np.full(len(candidates), -np.inf, dtype=np.float32)
+    available = np.ones(len(candidates), dtype=bool)
+    selected = np.empty(k, dtype=np.int64)
+
+    for i in range(k):
+        if i == 0:
+            scores = relevance.copy()
+        else:
+            scores = lambda_ * relevance - (1 - lambda_) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected[i] = best
+        available[best] = False
+        redundancy = np.maximum(redundancy, similarity[best])
+    return selected
@@ -0,0 +1,101 @@
+import re
+import uuid
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlmodel import Session, select
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.document import DocumentTemplate
+
+# Placeholders look like {{ field_name }}
+PLACEHOLDER = re.compile(r"\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}")
+
+class TemplateError(ValueError):
+    pass
+
+class CompiledTemplate:
+    """
+    A template parsed once into alternating literal text and field names, so
+    rendering is a single join with no regex work.
+    """
+
+    def __init__(self, template_content: str, fields: List[str]):
+        self.fields = list(fields)
+        self._parts: List[str] = []
+        self._slots: List[str] = []
+        position = 0
+        for match in PLACEHOLDER.finditer(template_content):
+            self._parts.append(template_content[position:match.start()])
+            self._slots.append(match.group(1))
+            position = match.end()
+        self._parts.append(template_content[position:])
+
+        undeclared = sorted(set(self._slots) - set(self.fields))
+        if undeclared:
+            raise TemplateError(f"Template uses undeclared fields: {', '.join(undeclared)}")
+
+    def validate(self, values: Dict[str, Any]) -> None:
+        missing = [field for field in self.fields if values.get(field) in (None, "")]
+        unknown = sorted(set(values) - set(self.fields))
+        problems = []
+        if missing:
+            problems.append(f"missing fields: {', '.join(missing)}")
+        if unknown:
+            problems.append(f"unknown fields: {', '.join(unknown)}")
+        if problems:
+            raise TemplateError("; ".join(problems))
+
+    def render(self, values: Dict[str, Any]) -> str:
+        self.validate(values)
+        out = [self._parts[0]]
+        for slot, literal in zip(self._slots, self._parts[1:]):
+            out.append(str(values[slot]))
+            out.append(literal)
+        return "".join(out)
+
+class TemplateService:
+    def __init__(self):
+        # (id, updated_at) -> compiled template; an edit changes the key
+        self.compiled: TTLCache[CompiledTemplate] = TTLCache(max_size=settings.TEMPLATE_CACHE_SIZE)
+
+    async def get_template(self, db: Session, template_id: uuid.UUID) -> Optional[Tuple[Any, CompiledTemplate]]:
+        """
+        (row, compiled) for a template, or None. The row only carries id, name,
+        is_premium and updated_at; the content is loaded when not yet compiled.
+        """
+        result = await db.execute(
+            select(DocumentTemplate.id, DocumentTemplate.name, DocumentTemplate.is_premium, DocumentTemplate.updated_at)
+            .where(DocumentTemplate.id == template_id)
+        )
+        row = result.first()
+        if row is None:
+            return None
+
+        key = (row.id, row.updated_at)
+        compiled = self.compiled.get(key)
+        if compiled is None:
+            result = await db.execute(
+                select(DocumentTemplate.template_content, DocumentTemplate.fields).where(DocumentTemplate.id == template_id)
+            )
+            content = result.first()
+            if content is None:
+                return None
+            compiled = CompiledTemplate(content.template_content, content.fields or [])
+            self.compiled.set(key, compiled)
+        return row, compiled
+
+    def render_batch(self, compiled: CompiledTemplate, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Render every field set; failures are reported per item"""
+        results = []
+        for i, values in enumerate(items):
+            try:
+                results.append({"index": i, "content": compiled.render(values)})
+            except TemplateError as e:
+                results.append({"index": i, "error": str(e)})
+        return results
+
+@lru_cache()
+def get_template_service() -> TemplateService:
+    return TemplateService()
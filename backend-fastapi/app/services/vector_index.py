@@ -0,0 +1,413 @@
+import asyncio
+import fcntl
+import heapq
+import json
+import os
+import struct
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize vectors along the last axis; zero vectors stay zero"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k highest scores, best first"""
+    if k <= 0 or len(scores) == 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+# Below this many rows per shard, thread handoff costs more than it saves
+MIN_SHARD_ROWS = 16384
+
+_shard_executor: Optional[ThreadPoolExecutor] = None
+_shard_executor_size = 0
+_shard_executor_lock = threading.Lock()
+
+def _submit_shards(shards: int, fn, bounds: Sequence[Tuple[int, int]]) -> list:
+    """
+    Submit one task per shard to the shared pool, growing it to `shards`
+    threads if needed. A replaced pool is shut down once its queued work is
+    done; submitting under the lock keeps callers off a pool being replaced.
+    """
+    global _shard_executor, _shard_executor_size
+    with _shard_executor_lock:
+        if _shard_executor is None or _shard_executor_size < shards:
+            if _shard_executor is not None:
+                _shard_executor.shutdown(wait=False)
+            _shard_executor = ThreadPoolExecutor(max_workers=shards, thread_name_prefix="vector-shard")
+            _shard_executor_size = shards
+        return [_shard_executor.submit(fn, start, stop) for start, stop in bounds]
+
+def scored_top_k(
+    matrix: np.ndarray,
+    query: np.ndarray,
+    k: int,
+    masked: Optional[np.ndarray] = None,
+    shards: int = 1,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (positions, scores) of the k best rows of matrix @ query, best first;
+    masked rows score -inf.
+
+    With shards > 1 the rows are split into contiguous shards scored on a
+    thread pool (the matrix product releases the GIL), each shard keeps its
+    own top-k and the candidates are merged with a heap.
+    """
+    shards = min(shards, len(matrix) // MIN_SHARD_ROWS)
+    if shards <= 1:
+        scores = matrix @ query
+        if masked is not None:
+            scores[masked] = -np.inf
+        positions = top_k(scores, k)
+        return positions, scores[positions]
+
+    def score_shard(start: int, stop: int) -> Tuple[np.ndarray, np.ndarray]:
+        scores = matrix[start:stop] @ query
+        if masked is not None:
+            scores[masked[start:stop]] = -np.inf
+        positions = top_k(scores, k)
+        return positions + start, scores[positions]
+
+    bounds = np.linspace(0, len(matrix), shards + 1, dtype=np.int64)
+    futures = _submit_shards(shards, score_shard, [(int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:])])
+    candidates = (
+        (float(score), int(position))
+        for future in futures
+        for position, score in zip(*future.result())
+    )
+    best = heapq.nlargest(k, candidates)
+    return (
+        np.array([position for _, position in best], dtype=np.int64),
+        np.array([score for score, _ in best], dtype=np.float32),
+    )
+
+class VectorIndex:
+    """
+    In-memory matrix of normalized embeddings keyed by document id.
+
+    Scoring is a single matrix-vector product, so a dot product equals the
+    cosine similarity used by DocumentService.cosine_similarity. Storage grows
+    geometrically and removals swap in the last row, so single-document
+    updates stay O(dim).
+    """
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.ids: List[uuid.UUID] = []
+        self._positions: Dict[uuid.UUID, int] = {}
+        self._matrix = np.zeros((0, dim), dtype=np.float32)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[uuid.UUID, Optional[List[float]]]]) -> "VectorIndex":
+        """Build from (id, embedding) rows; empty embeddings are skipped"""
+        ids = []
+        vectors = []
+        for doc_id, embedding in rows:
+            if embedding:
+                ids.append(doc_id)
+                vectors.append(embedding)
+        if not vectors:
+            return cls(dim=0)
+
+        dim = len(vectors[0])
+        consistent = [(i, v) for i, v in zip(ids, vectors) if len(v) == dim]
+        if len(consistent) != len(ids):
+            print(f"Warning: skipped {len(ids) - len(consistent)} embeddings with dimension != {dim}")
+        index = cls(dim=dim)
+        if consistent:
+            index.add([i for i, _ in consistent], np.array([v for _, v in consistent], dtype=np.float32))
+        return index
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, doc_id: uuid.UUID) -> bool:
+        return doc_id in self._positions
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self._matrix[:len(self.ids)]
+
+    @property
+    def nbytes(self) -> int:
+        return self._matrix.nbytes
+
+    def add(self, ids: Sequence[uuid.UUID], vectors) -> None:
+        """Insert or replace embeddings"""
+        vectors = normalize(np.atleast_2d(np.asarray(vectors, dtype=np.float32)))
+        if len(ids) == 0:
+            return
+        if self.dim == 0 and not self.ids:
+            self.dim = vectors.shape[1]
+            self._matrix = np.zeros((0, self.dim), dtype=np.float32)
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match index dimension {self.dim}")
+
+        for doc_id, vector in zip(ids, vectors):
+            position = self._positions.get(doc_id)
+            if position is None:
+                position = len(self.ids)
+                self._reserve(position + 1)
+                self.ids.append(doc_id)
+                self._positions[doc_id] = position
+            self._matrix[position] = vector
+
+    def remove(self, ids: Iterable[uuid.UUID]) -> None:
+        for doc_id in ids:
+            position = self._positions.pop(doc_id, None)
+            if position is None:
+                continue
+            last = len(self.ids) - 1
+            if position != last:
+                moved = self.ids[last]
+                self.ids[position] = moved
+                self._positions[moved] = position
+                self._matrix[position] = self._matrix[last]
+            self.ids.pop()
+
+    def vectors(self, ids: Sequence[uuid.UUID]) -> np.ndarray:
+        return self._matrix[[self._positions[i] for i in ids]]
+
+    def stale_ids(self, live: Iterable[uuid.UUID]) -> List[uuid.UUID]:
+        """Indexed ids that are not in live"""
+        live = set(live)
+        return [doc_id for doc_id in self.ids if doc_id not in live]
+
+    def search(self, query: Sequence[float], k: int, shards: int = 1) -> List[Tuple[uuid.UUID, float]]:
+        """Top-k (id, cosine similarity) pairs, best first"""
+        # Searches run in a worker thread while adds and removes run on the
+        # event loop: score against a snapshot of the ids, so a concurrent
+        # removal at worst yields an id that is no longer in the table
+        ids = self.ids[:]
+        if not ids or len(query) != self.dim:
+            return []
+        positions, scores = scored_top_k(self._matrix[:len(ids)], normalize(query), k, shards=shards)
+        return [(ids[i], float(score)) for i, score in zip(positions, scores)]
+
+    def _reserve(self, size: int) -> None:
+        if size <= len(self._matrix):
+            return
+        capacity = max(size, 2 * len(self._matrix), 1024)
+        grown = np.zeros((capacity, self.dim), dtype=np.float32)
+        grown[:len(self.ids)] = self.matrix
+        self._matrix = grown
+
+# On-disk index shared by all workers: a page-aligned JSON header, the float32
+# matrix and the ids as 16-byte UUIDs sorted so lookups can binary-search.
+INDEX_MAGIC = b"CGVIDX01"
+INDEX_HEADER_SIZE = 4096
+
+def _id_keys(ids: Iterable[uuid.UUID]) -> np.ndarray:
+    return np.array([doc_id.bytes for doc_id in ids], dtype="S16")
+
+def write_index_file(
+    path: str,
+    ids: Sequence[uuid.UUID],
+    matrix: np.ndarray,
+    model: str,
+    watermark: Optional[datetime] = None,
+    dimensions: Optional[int] = None,
+) -> None:
+    """
+    Write an index file and atomically move it into place. Workers that still
+    map the previous file keep reading it until they reopen the new one.
+    dimensions records the truncation setting the vectors were built with.
+    """
+    keys = _id_keys(ids)
+    order = np.argsort(keys, kind="stable")
+    matrix = np.asarray(matrix, dtype=np.float32)
+    matrix = normalize(matrix) if len(ids) else np.zeros((0, 0), dtype=np.float32)
+    header = json.dumps({
+        "model": model,
+        "dim": int(matrix.shape[1]) if len(ids) else 0,
+        "dimensions": dimensions,
+        "count": len(ids),
+        "watermark": watermark.isoformat() if watermark else None,
+        "built_at": datetime.utcnow().isoformat(),
+    }).encode("utf-8")
+    if len(INDEX_MAGIC) + 4 + len(header) > INDEX_HEADER_SIZE:
+        raise ValueError("Index header too large")
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(INDEX_MAGIC + struct.pack("<I", len(header)) + header)
+            f.write(b"\0" * (INDEX_HEADER_SIZE - f.tell()))
+            f.write(np.ascontiguousarray(matrix[order]).tobytes())
+            f.write(keys[order].tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def read_index_header(path: str) -> Dict:
+    with open(path, "rb") as f:
+        prefix = f.read(len(INDEX_MAGIC) + 4)
+        if len(prefix) < len(INDEX_MAGIC) + 4 or prefix[:len(INDEX_MAGIC)] != INDEX_MAGIC:
+            raise ValueError(f"{path} is not a vector index file")
+        (length,) = struct.unpack("<I", prefix[len(INDEX_MAGIC):])
+        return json.loads(f.read(length))
+
+def file_identity(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_dev, stat.st_ino, stat.st_mtime_ns)
+
+@asynccontextmanager
+async def index_file_lock(path: str):
+    """Cross-process lock so only one worker rebuilds the index file at a time"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    fd = os.open(f"{path}.lock", os.O_CREAT | os.O_RDWR, 0o644)
+    try:
+        await asyncio.to_thread(fcntl.flock, fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+class MmapVectorIndex:
+    """
+    Read-only base index mapped from an index file, plus a private overlay.
+
+    Every worker maps the same file, so the base matrix lives once in the page
+    cache however many workers run. Rows inserted or replaced after the file
+    was built go to an in-memory VectorIndex overlay, and superseded base rows
+    are masked out, until the next rebuild folds them into a new file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.identity = file_identity(path)
+        self.header = read_index_header(path)
+        self.model: str = self.header["model"]
+        self.dim: int = self.header["dim"]
+        self.count: int = self.header["count"]
+        self.dimensions: Optional[int] = self.header.get("dimensions")
+        watermark = self.header.get("watermark")
+        self.watermark: Optional[datetime] = datetime.fromisoformat(watermark) if watermark else None
+
+        if self.count:
+            self._matrix = np.memmap(path, dtype=np.float32, mode="r", offset=INDEX_HEADER_SIZE,
+                                     shape=(self.count, self.dim))
+            self._ids = np.memmap(path, dtype="S16", mode="r",
+                                  offset=INDEX_HEADER_SIZE + self._matrix.nbytes, shape=(self.count,))
+        else:
+            self._matrix = np.zeros((0, self.dim), dtype=np.float32)
+            self._ids = np.zeros(0, dtype="S16")
+        self._masked: Optional[np.ndarray] = None
+        self.overlay = VectorIndex(dim=self.dim)
+
+    def __len__(self) -> int:
+        masked = int(self._masked.sum()) if self._masked is not None else 0
+        return self.count - masked + len(self.overlay)
+
+    def __contains__(self, doc_id: uuid.UUID) -> bool:
+        if doc_id in self.overlay:
+            return True
+        positions, found = self._lookup([doc_id])
+        return bool(found[0]) and (self._masked is None or not self._masked[positions[0]])
+
+    @property
+    def nbytes(self) -> int:
+        """Private (per-worker) memory; the mapped file is shared"""
+        masked = self._masked.nbytes if self._masked is not None else 0
+        return self.overlay.nbytes + masked
+
+    @property
+    def mapped_bytes(self) -> int:
+        return self._matrix.nbytes + self._ids.nbytes
+
+    def _lookup(self, ids: Sequence[uuid.UUID]) -> Tuple[np.ndarray, np.ndarray]:
+        """(positions, found) of ids in the base file; positions are only valid where found"""
+        if not self.count or not len(ids):
+            return np.zeros(len(ids), dtype=np.int64), np.zeros(len(ids), dtype=bool)
+        keys = _id_keys(ids)
+        positions = np.searchsorted(self._ids, keys)
+        found = positions < self.count
+        found[found] = self._ids[positions[found]] == keys[found]
+        return positions, found
+
+    def _base_positions(self, ids: Sequence[uuid.UUID]) -> np.ndarray:
+        """Positions of ids present in the base file"""
+        positions, found = self._lookup(ids)
+        return positions[found]
+
+    def in_base(self, ids: Sequence[uuid.UUID]) -> np.ndarray:
+        """Boolean mask of ids stored in the base file (masked or not)"""
+        return self._lookup(ids)[1]
+
+    def _mask(self, ids: Sequence[uuid.UUID]) -> None:
+        positions = self._base_positions(ids)
+        if len(positions):
+            if self._masked is None:
+                self._masked = np.zeros(self.count, dtype=bool)
+            self._masked[positions] = True
+
+    def add(self, ids: Sequence[uuid.UUID], vectors) -> None:
+        """Insert or replace embeddings in the overlay"""
+        self._mask(ids)
+        self.overlay.add(ids, vectors)
+
+    def remove(self, ids: Iterable[uuid.UUID]) -> None:
+        ids = list(ids)
+        self._mask(ids)
+        self.overlay.remove(ids)
+
+    def stale_ids(self, live: Iterable[uuid.UUID]) -> List[uuid.UUID]:
+        """Unmasked base ids and overlay ids that are not in live"""
+        live = set(live)
+        stale = self.overlay.stale_ids(live)
+        if self.count:
+            missing = ~np.isin(self._ids, _id_keys(live))
+            if self._masked is not None:
+                missing &= ~self._masked
+            stale.extend(uuid.UUID(bytes=key.ljust(16, b"\0")) for key in self._ids[missing])
+        return stale
+
+    def vectors(self, ids: Sequence[uuid.UUID]) -> np.ndarray:
+        """Normalized embeddings of ids returned by search, overlay rows first"""
+        result = np.empty((len(ids), self.dim), dtype=np.float32)
+        base_rows = []
+        for row, doc_id in enumerate(ids):
+            if doc_id in self.overlay:
+                result[row] = self.overlay.vectors([doc_id])[0]
+            else:
+                base_rows.append(row)
+        if base_rows:
+            positions = np.searchsorted(self._ids, _id_keys([ids[row] for row in base_rows]))
+            result[base_rows] = self._matrix[positions]
+        return result
+
+    def search(self, query: Sequence[float], k: int, shards: int = 1) -> List[Tuple[uuid.UUID, float]]:
+        """Top-k (id, cosine similarity) pairs over base and overlay, best first"""
+        if self.count and len(query) != self.dim:
+            return []
+        hits = self.overlay.search(query, k)
+        if self.count:
+            positions, scores = scored_top_k(self._matrix, normalize(query), k, masked=self._masked, shards=shards)
+            for i, score in zip(positions, scores):
+                if score == -np.inf:
+                    break
+                hits.append((uuid.UUID(bytes=self._ids[i].ljust(16, b"\0")), float(score)))
+        hits.sort(key=lambda hit: hit[1], reverse=True)
+        return hits[:k]
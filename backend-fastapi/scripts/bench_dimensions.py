@@ -0,0 +1,129 @@
+"""
+Matryoshka dimension benchmark on the real documents table.
+
+Loads the stored embeddings once and, for each candidate EMBEDDING_DIMENSIONS,
+builds the in-memory index from truncated vectors and reports its size, search
+latency and recall@k against exact search at the full stored dimension.
+
+Queries are either real questions embedded through Ollama (--queries-file, one
+per line) or, by default, a sample of stored chunks used as queries with the
+chunk itself left out of the results.
+
+Run from backend-fastapi/:
+
+    python -m scripts.bench_dimensions --dims 768 512 256 128
+    python -m scripts.bench_dimensions --queries-file questions.txt --output dims.json
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlmodel import select
+
+from app.db.session import async_session
+from app.models.document import Document
+from app.services.ollama_service import get_ollama_service, truncate_embedding
+from app.services.vector_index import VectorIndex, normalize, top_k
+
+async def load_embeddings():
+    async with async_session() as db:
+        result = await db.stream(
+            select(Document.id, Document.embedding_vector)
+            .where(Document.embedding_vector != None)
+            .execution_options(yield_per=5000)
+        )
+        rows = [(doc_id, embedding) async for doc_id, embedding in result if embedding]
+    full_dim = max(len(embedding) for _, embedding in rows)
+    rows = [(doc_id, embedding) for doc_id, embedding in rows if len(embedding) == full_dim]
+    return [doc_id for doc_id, _ in rows], np.array([embedding for _, embedding in rows], dtype=np.float32)
+
+def bench_dimension(
+    ids: List,
+    matrix: np.ndarray,
+    queries: np.ndarray,
+    exclude: List[Optional[int]],
+    dimensions: int,
+    k: int,
+) -> Dict:
+    full = normalize(matrix)
+    index = VectorIndex.from_rows(
+        (doc_id, truncate_embedding(row.tolist(), dimensions)) for doc_id, row in zip(ids, matrix)
+    )
+
+    latencies = []
+    recalls = []
+    for query, skip in zip(queries, exclude):
+        extra = 1 if skip is not None else 0
+        truth = [i for i in top_k(full @ normalize(query), k + extra) if i != skip][:k]
+
+        truncated = truncate_embedding(query.tolist(), dimensions)
+        start = time.perf_counter()
+        hits = index.search(truncated, k + extra)
+        latencies.append(time.perf_counter() - start)
+
+        found = [doc_id for doc_id, _ in hits if skip is None or doc_id != ids[skip]][:k]
+        recalls.append(len({ids[i] for i in truth} & set(found)) / len(truth))
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "dimensions": index.dim,
+        "index_mb": round(index.matrix.nbytes / 2**20, 2),
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 3),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 3),
+        "recall_at_k": round(float(np.mean(recalls)), 4),
+    }
+
+async def main(args: argparse.Namespace) -> int:
+    ids, matrix = await load_embeddings()
+    if not len(ids):
+        print("No embedded documents found")
+        return 1
+    print(f"{len(ids)} documents, stored dimension {matrix.shape[1]}")
+
+    rng = np.random.default_rng(args.seed)
+    if args.queries_file:
+        with open(args.queries_file) as f:
+            texts = [line.strip() for line in f if line.strip()]
+        # Queries are embedded at full dimension and truncated per run below
+        ollama_service = get_ollama_service()
+        embeddings = [ollama_service.client.embeddings(model=ollama_service.embedding_model, prompt=text)["embedding"]
+                      for text in texts]
+        queries = np.array(embeddings, dtype=np.float32)
+        exclude: List[Optional[int]] = [None] * len(queries)
+    else:
+        sample = rng.choice(len(ids), size=min(args.queries, len(ids)), replace=False)
+        queries = matrix[sample]
+        exclude = [int(i) for i in sample]
+
+    results = []
+    for dimensions in sorted(set(args.dims), reverse=True):
+        if dimensions > matrix.shape[1]:
+            continue
+        result = bench_dimension(ids, matrix, queries, exclude, dimensions, args.k)
+        results.append(result)
+        print(
+            f"  dim {result['dimensions']:>4}: index {result['index_mb']:.1f}MB  "
+            f"p50 {result['p50_ms']:.2f}ms  p99 {result['p99_ms']:.2f}ms  recall@{args.k} {result['recall_at_k']:.3f}"
+        )
+
+    with open(args.output, "w") as f:
+        json.dump({"documents": len(ids), "stored_dim": int(matrix.shape[1]), "k": args.k, "results": results}, f, indent=2)
+    print(f"\nResults written to {args.output}")
+    return 0
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Memory/latency/recall of truncated embeddings on the documents table")
+    parser.add_argument("--dims", type=int, nargs="+", default=[768, 512, 256, 128])
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=200, help="Stored chunks sampled as queries")
+    parser.add_argument("--queries-file", help="Real questions, one per line (embedded through Ollama)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_dimensions.json")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
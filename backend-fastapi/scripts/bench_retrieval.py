@@ -0,0 +1,281 @@
+"""
+Retrieval benchmark over synthetic corpora.
+
+Loads a deterministic corpus (see scripts/fake_embedder.py) into SQLite or
+Postgres and measures, for every retrieval mode and corpus size, the p50/p99
+latency, peak memory and recall@k against exact brute-force search. Results are
+written as JSON so that runs of different versions can be compared.
+
+Run from backend-fastapi/:
+
+    python -m scripts.bench_retrieval --sizes 1000 10000 --output bench.json
+    python -m scripts.bench_retrieval --db postgresql+asyncpg://user:pw@localhost/bench \\
+        --sizes 100000 1000000
+    python -m scripts.bench_retrieval --sizes 1000 --baseline bench.json
+
+Only rows with document_type="bench" are ever written or deleted; the run
+aborts if the target table holds any other documents.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List
+
+import numpy as np
+from sqlalchemy import delete, func, insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import select
+
+from app.core.config import settings
+from app.models.document import Document
+from app.services.document_service import get_document_service
+from app.services.ollama_service import get_ollama_service
+from scripts.fake_embedder import FakeEmbedder, SyntheticCorpus
+
+BENCH_DOCUMENT_TYPE = "bench"
+INSERT_BATCH_SIZE = 1000
+
+# Retrieval modes as settings overrides applied around each measurement
+# Recall is measured against exact top-k, so plain modes run without MMR;
+# "mmr" shows the reranking overhead (and its expected recall drop)
+MODES: Dict[str, Dict[str, Any]] = {
+    "scan": {"RETRIEVAL_MODE": "scan", "MMR_LAMBDA": 1.0},
+    "index": {"RETRIEVAL_MODE": "index", "VECTOR_INDEX_PATH": "", "MMR_LAMBDA": 1.0},
+    "mmap": {"RETRIEVAL_MODE": "index", "VECTOR_INDEX_PATH": "data/bench_vector_index.bin", "MMR_LAMBDA": 1.0},
+    "mmr": {"RETRIEVAL_MODE": "index", "VECTOR_INDEX_PATH": "", "MMR_LAMBDA": 0.7},
+    "sharded": {"RETRIEVAL_MODE": "index", "VECTOR_INDEX_PATH": "", "MMR_LAMBDA": 1.0, "SEARCH_SHARDS": os.cpu_count() or 4},
+    # Matryoshka truncation; recall is still measured against full-dimension search
+    "dim512": {"RETRIEVAL_MODE": "index", "VECTOR_INDEX_PATH": "", "MMR_LAMBDA": 1.0, "EMBEDDING_DIMENSIONS": 512},
+    "dim256": {"RETRIEVAL_MODE": "index", "VECTOR_INDEX_PATH": "", "MMR_LAMBDA": 1.0, "EMBEDDING_DIMENSIONS": 256},
+}
+
+def chunk_id(seed: int, index: int) -> uuid.UUID:
+    """Stable id so a corpus already in the DB can be reused across runs"""
+    return uuid.UUID(int=(seed << 64) | index)
+
+async def count_rows(db: AsyncSession, bench_only: bool) -> int:
+    statement = select(func.count()).select_from(Document)
+    if bench_only:
+        statement = statement.where(Document.document_type == BENCH_DOCUMENT_TYPE)
+    else:
+        statement = statement.where(Document.document_type != BENCH_DOCUMENT_TYPE)
+    result = await db.execute(statement)
+    return result.scalar_one()
+
+async def load_corpus(async_session, corpus: SyntheticCorpus, size: int, reuse: bool) -> None:
+    """Make the documents table hold exactly the first ``size`` bench chunks"""
+    async with async_session() as db:
+        if await count_rows(db, bench_only=False):
+            raise SystemExit("Refusing to benchmark: documents table contains non-bench rows")
+
+        existing = await count_rows(db, bench_only=True)
+        if existing > size or (existing and not reuse):
+            await db.execute(delete(Document).where(Document.document_type == BENCH_DOCUMENT_TYPE))
+            await db.commit()
+            existing = 0
+
+        start_time = time.perf_counter()
+        for start in range(existing, size, INSERT_BATCH_SIZE):
+            stop = min(start + INSERT_BATCH_SIZE, size)
+            embeddings = corpus.chunk_embeddings(start, stop)
+            now = datetime.utcnow()
+            rows = [
+                {
+                    "id": chunk_id(corpus.seed, i),
+                    "title": f"Bench chunk {i}",
+                    "content": corpus.chunk_text(i),
+                    "document_type": BENCH_DOCUMENT_TYPE,
+                    "language": "es",
+                    "embedding_vector": embeddings[i - start].tolist(),
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for i in range(start, stop)
+            ]
+            await db.execute(insert(Document), rows)
+            await db.commit()
+
+        if size > existing:
+            print(f"  loaded {size - existing} chunks in {time.perf_counter() - start_time:.1f}s")
+
+def exact_top_k(matrix: np.ndarray, query: np.ndarray, k: int) -> List[int]:
+    scores = matrix @ query
+    top = np.argpartition(-scores, min(k, len(scores) - 1))[:k]
+    return top[np.argsort(-scores[top])].tolist()
+
+async def bench_mode(
+    async_session,
+    overrides: Dict[str, Any],
+    corpus: SyntheticCorpus,
+    matrix: np.ndarray,
+    size: int,
+    args: argparse.Namespace,
+) -> Dict:
+    rng = np.random.default_rng(args.seed + size)
+    targets = rng.integers(0, size, size=args.queries + args.warmup)
+    queries = [corpus.query_text(int(i)) for i in targets]
+    id_to_index = {chunk_id(corpus.seed, i): i for i in range(size)}
+
+    async def run(query: str) -> List[Document]:
+        # Fresh session per query, as get_db does per request
+        async with async_session() as db:
+            return await get_document_service().search_relevant_documents(db, query, k=args.k)
+
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    # Start cold: the corpus changed since the previous size and the first
+    # (warmup) query pays for loading (or building) the index
+    document_service = get_document_service()
+    document_service.invalidate_index()
+    document_service.content_cache.clear()
+    if settings.VECTOR_INDEX_PATH and os.path.exists(settings.VECTOR_INDEX_PATH):
+        os.remove(settings.VECTOR_INDEX_PATH)
+    for query in queries[:args.warmup]:
+        await run(query)
+
+    latencies = []
+    recalls = []
+    for query in queries[args.warmup:]:
+        start = time.perf_counter()
+        docs = await run(query)
+        latencies.append(time.perf_counter() - start)
+
+        truth = set(exact_top_k(matrix, corpus.embedder.embed_array(query), args.k))
+        found = {id_to_index.get(doc.id) for doc in docs}
+        recalls.append(len(truth & found) / len(truth))
+
+    # Memory is measured on a separate query so tracing does not skew latency
+    tracemalloc.start()
+    await run(queries[-1])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    index = document_service.index
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "size": size,
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 3),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 3),
+        "mean_ms": round(float(latencies_ms.mean()), 3),
+        "peak_query_alloc_mb": round(peak / 2**20, 2),
+        "index_mb": round(index.nbytes / 2**20, 2) if index else 0.0,
+        "mapped_mb": round(getattr(index, "mapped_bytes", 0) / 2**20, 2),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "recall_at_k": round(float(np.mean(recalls)), 4),
+    }
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+def compare(results: List[Dict], baseline_path: str, tolerance: float) -> bool:
+    """Print deltas against a previous run; return False on regressions"""
+    with open(baseline_path) as f:
+        baseline = {(r["mode"], r["size"]): r for r in json.load(f)["results"]}
+
+    ok = True
+    print(f"\nComparison with {baseline_path} (tolerance {tolerance:.0%}):")
+    for result in results:
+        old = baseline.get((result["mode"], result["size"]))
+        if not old:
+            continue
+        p99_ratio = result["p99_ms"] / old["p99_ms"] if old["p99_ms"] else 1.0
+        recall_delta = result["recall_at_k"] - old["recall_at_k"]
+        regressed = p99_ratio > 1 + tolerance or recall_delta < -0.01
+        ok = ok and not regressed
+        flag = "REGRESSION" if regressed else "ok"
+        print(
+            f"  {result['mode']:>10} n={result['size']:<8} "
+            f"p99 x{p99_ratio:.2f}  recall {recall_delta:+.4f}  {flag}"
+        )
+    return ok
+
+async def main(args: argparse.Namespace) -> int:
+    engine = create_async_engine(args.db, echo=False)
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: Document.__table__.create(c, checkfirst=True))
+
+    embedder = FakeEmbedder(dim=args.dim, seed=args.seed)
+    corpus = SyntheticCorpus(embedder, seed=args.seed)
+    # Retrieval embeds queries through the Ollama service; swap in the fake one
+    get_ollama_service().get_embeddings = embedder.embed
+
+    defaults = {name: getattr(settings, name) for overrides in MODES.values() for name in overrides}
+    modes = args.modes or list(MODES)
+    results = []
+    for size in sorted(args.sizes):
+        print(f"Corpus size {size}")
+        await load_corpus(async_session, corpus, size, args.reuse)
+        matrix = corpus.chunk_embeddings(0, size)
+        for name in modes:
+            for setting, value in defaults.items():
+                setattr(settings, setting, value)
+            result = {"mode": name, **await bench_mode(async_session, MODES[name], corpus, matrix, size, args)}
+            results.append(result)
+            print(
+                f"  {name:>10}: p50 {result['p50_ms']:.2f}ms  p99 {result['p99_ms']:.2f}ms  "
+                f"alloc {result['peak_query_alloc_mb']:.1f}MB  recall@{args.k} {result['recall_at_k']:.3f}"
+            )
+
+    await engine.dispose()
+    for name, value in defaults.items():
+        setattr(settings, name, value)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "dialect": engine.dialect.name,
+            "dim": args.dim,
+            "k": args.k,
+            "queries": args.queries,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline and not compare(results, args.baseline, args.tolerance):
+        return 1
+    return 0
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark document retrieval on synthetic corpora")
+    parser.add_argument("--db", default="sqlite+aiosqlite:///bench_retrieval.db",
+                        help="Async SQLAlchemy URL of a dedicated benchmark database")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--modes", nargs="+", choices=sorted(MODES))
+    parser.add_argument("--dim", type=int, default=768, help="Embedding dimension (nomic-embed-text: 768)")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--reuse", action="store_true",
+                        help="Keep bench rows already in the DB and only insert missing chunks")
+    parser.add_argument("--output", default="bench_retrieval.json")
+    parser.add_argument("--baseline", help="Previous results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed relative p99 slowdown before flagging a regression")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
@@ -0,0 +1,93 @@
+"""
+Sharded scoring benchmark: single-query latency of the vector index search
+for several SEARCH_SHARDS values on a random in-memory corpus.
+
+No database or Ollama is needed. The default corpus (1M x 768 float32) takes
+about 3 GB of RAM; use --dim 256 for a Matryoshka-sized run.
+
+Run from backend-fastapi/:
+
+    python -m scripts.bench_sharding --rows 1000000 --shards 1 2 4 8 16
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from app.services.vector_index import normalize, scored_top_k
+
+GENERATE_BATCH_ROWS = 100000
+
+def random_matrix(rows: int, dim: int, seed: int) -> np.ndarray:
+    """Normalized random rows, generated in batches to bound temporary memory"""
+    rng = np.random.default_rng(seed)
+    matrix = np.empty((rows, dim), dtype=np.float32)
+    for start in range(0, rows, GENERATE_BATCH_ROWS):
+        stop = min(start + GENERATE_BATCH_ROWS, rows)
+        matrix[start:stop] = normalize(rng.standard_normal((stop - start, dim), dtype=np.float32))
+    return matrix
+
+def main(args: argparse.Namespace) -> int:
+    print(f"Generating {args.rows} x {args.dim} corpus...")
+    matrix = random_matrix(args.rows, args.dim, args.seed)
+    rng = np.random.default_rng(args.seed + 1)
+    queries = normalize(rng.standard_normal((args.queries + args.warmup, args.dim), dtype=np.float32))
+
+    results = []
+    baseline_p50 = None
+    expected = None
+    for shards in args.shards:
+        for query in queries[:args.warmup]:
+            scored_top_k(matrix, query, args.k, shards=shards)
+        latencies = []
+        found = []
+        for query in queries[args.warmup:]:
+            start = time.perf_counter()
+            positions, _ = scored_top_k(matrix, query, args.k, shards=shards)
+            latencies.append(time.perf_counter() - start)
+            found.append(positions.tolist())
+
+        # Every shard count must return exactly the single-threaded results
+        if expected is None:
+            expected = found
+        identical = found == expected
+        latencies_ms = np.array(latencies) * 1000
+        p50 = float(np.percentile(latencies_ms, 50))
+        baseline_p50 = baseline_p50 or p50
+        result = {
+            "shards": shards,
+            "p50_ms": round(p50, 3),
+            "p99_ms": round(float(np.percentile(latencies_ms, 99)), 3),
+            "speedup": round(baseline_p50 / p50, 2),
+            "identical_results": identical,
+        }
+        results.append(result)
+        print(
+            f"  shards {shards:>2}: p50 {result['p50_ms']:.2f}ms  p99 {result['p99_ms']:.2f}ms  "
+            f"x{result['speedup']:.2f}{'' if identical else '  RESULTS DIFFER'}"
+        )
+
+    report = {"rows": args.rows, "dim": args.dim, "k": args.k, "cpus": os.cpu_count(), "results": results}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+    return 0 if all(r["identical_results"] for r in results) else 1
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark sharded vector scoring")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8, 16],
+                        help="Shard counts to compare; the first is the speedup baseline")
+    parser.add_argument("--k", type=int, default=50, help="Candidates per query (MMR_CANDIDATES)")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_sharding.json")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    sys.exit(main(parse_args()))
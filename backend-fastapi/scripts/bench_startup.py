@@ -0,0 +1,80 @@
+"""
+Startup-time benchmark based on ``python -X importtime``.
+
+Imports a module in a fresh interpreter, reports its total import time and
+the slowest imports, and fails if the total exceeds --max-ms or if any
+dependency that should only load on first use is imported.
+
+    python -m scripts.bench_startup
+    python -m scripts.bench_startup --module app.main --max-ms 1500 --top 20
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# Loaded on first use (PDF upload, retrieval, first Ollama call, first hash).
+# bcrypt itself is not listed: python-jose imports cryptography, whose ssh
+# serialization module imports bcrypt, and JWTs are checked on every request.
+DEFERRED_MODULES = ["fitz", "numpy", "ollama", "passlib"]
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def import_times(module: str) -> List[Tuple[str, int, int]]:
+    """(module, self_us, cumulative_us) for every module imported by ``module``"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=BACKEND_DIR,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times.append((name.strip(), int(self_us), int(cumulative_us)))
+    return times
+
+def deferred_imports(times: List[Tuple[str, int, int]]) -> Dict[str, int]:
+    """Deferred modules that were imported anyway, with their cumulative time"""
+    found = {}
+    for name, _, cumulative in times:
+        root = name.split(".")[0]
+        if root in DEFERRED_MODULES and name == root:
+            found[root] = cumulative
+    return found
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure import time of the app")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--max-ms", type=float, help="Fail if the total import time exceeds this")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args(argv)
+
+    times = import_times(args.module)
+    total_ms = next(c for name, _, c in times if name == args.module) / 1000
+
+    print(f"{args.module}: {total_ms:.1f} ms cumulative import time")
+    print("\nSlowest imports (self time):")
+    for name, self_us, cumulative_us in sorted(times, key=lambda t: t[1], reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  (cumulative {cumulative_us / 1000:8.1f} ms)  {name}")
+
+    failed = False
+    deferred = deferred_imports(times)
+    if deferred:
+        failed = True
+        print("\nDeferred dependencies imported at startup:")
+        for name, cumulative_us in deferred.items():
+            print(f"  {name} ({cumulative_us / 1000:.1f} ms)")
+    if args.max_ms is not None and total_ms > args.max_ms:
+        failed = True
+        print(f"\nImport time {total_ms:.1f} ms exceeds budget of {args.max_ms:.1f} ms")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,8 @@
-from sqlmodel import Session, select, create_engine
+from sqlmodel import Session, select
 from app.models.document import Document
-from app.core.config import settings
+from app.db.session import make_sync_engine
 
-engine = create_engine(settings.DATABASE_URI)
+engine = make_sync_engine()
 
 def check_docs():
     with Session(engine) as db:
@@ -1,14 +1,14 @@
 import sys
-from sqlmodel import Session, select, create_engine
+from sqlmodel import Session, select
 from app.models.document import Document
-from app.services.ollama_service import ollama_service
+from app.services.ollama_service import get_ollama_service
 from app.api import deps
-from app.core.config import settings
+from app.db.session import make_sync_engine
 import asyncio
 import numpy as np
 
 # Setup DB
-engine = create_engine(settings.DATABASE_URI)
+engine = make_sync_engine()
 
 def debug_rag():
     with Session(engine) as db:
@@ -22,7 +22,7 @@ def debug_rag():
         # 2. Check query embedding
         query = "What is the secret national dish of Paraguay?"
         print(f"\nGenerating embedding for query: '{query}'")
-        query_emb = ollama_service.get_embeddings(query)
+        query_emb = get_ollama_service().get_embeddings(query)
         print(f"Query embedding len: {len(query_emb)}")
         
         if not docs or not query_emb:
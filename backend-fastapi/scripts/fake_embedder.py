@@ -0,0 +1,110 @@
+import zlib
+from typing import Dict, List
+
+import numpy as np
+
+class FakeEmbedder:
+    """
+    Deterministic stand-in for the Ollama embedding model.
+
+    Every token maps to a fixed pseudo-random vector seeded from a hash of the
+    token, and a text embeds to the normalized sum of its token vectors. Texts
+    that share words therefore land close to each other, which is enough
+    structure for meaningful recall measurements without a running model.
+    """
+
+    def __init__(self, dim: int = 768, seed: int = 0):
+        self.dim = dim
+        self.seed = seed
+        self._token_vectors: Dict[str, np.ndarray] = {}
+
+    def token_vector(self, token: str) -> np.ndarray:
+        vector = self._token_vectors.get(token)
+        if vector is None:
+            token_seed = zlib.crc32(token.encode("utf-8")) ^ self.seed
+            rng = np.random.default_rng(token_seed)
+            vector = rng.standard_normal(self.dim).astype(np.float32)
+            self._token_vectors[token] = vector
+        return vector
+
+    def embed_array(self, text: str) -> np.ndarray:
+        tokens = text.lower().split()
+        if not tokens:
+            return np.zeros(self.dim, dtype=np.float32)
+        vector = np.sum([self.token_vector(t) for t in tokens], axis=0)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed(self, text: str) -> List[float]:
+        """Same contract as OllamaService.get_embeddings"""
+        return self.embed_array(text).tolist()
+
+class SyntheticCorpus:
+    """
+    Deterministic corpus of pseudo-words grouped into topics.
+
+    Chunk ``i`` is always the same text for a given seed, so corpora of
+    increasing size are prefixes of each other and can be loaded incrementally.
+    """
+
+    SYLLABLES = [
+        "ra", "mo", "te", "gua", "ni", "pa", "ry", "ju", "ka", "so",
+        "la", "me", "ta", "ve", "ri", "do", "ne", "ci", "po", "ha",
+    ]
+    EMBED_BATCH_SIZE = 4096
+
+    def __init__(
+        self,
+        embedder: FakeEmbedder,
+        vocab_size: int = 5000,
+        topics: int = 200,
+        words_per_topic: int = 60,
+        chunk_words: int = 64,
+        seed: int = 0,
+    ):
+        self.embedder = embedder
+        self.chunk_words = chunk_words
+        self.seed = seed
+
+        rng = np.random.default_rng(seed)
+        syllables = np.array(self.SYLLABLES)
+        picks = rng.integers(0, len(syllables), size=(vocab_size, 3))
+        words = ["".join(syllables[row]) + str(n) for n, row in enumerate(picks)]
+        self.vocab = np.array(words)
+        self.topics = rng.integers(0, vocab_size, size=(topics, words_per_topic))
+        self.vocab_matrix = np.stack([embedder.token_vector(w) for w in words])
+
+    def _chunk_tokens(self, index: int) -> np.ndarray:
+        rng = np.random.default_rng((self.seed, index))
+        topic = self.topics[rng.integers(0, len(self.topics))]
+        # Mostly on-topic words with some background noise
+        on_topic = rng.integers(0, len(topic), size=self.chunk_words)
+        tokens = topic[on_topic]
+        noise = rng.random(self.chunk_words) < 0.2
+        tokens[noise] = rng.integers(0, len(self.vocab), size=int(noise.sum()))
+        return tokens
+
+    def chunk_text(self, index: int) -> str:
+        return " ".join(self.vocab[self._chunk_tokens(index)])
+
+    def chunk_embeddings(self, start: int, stop: int) -> np.ndarray:
+        """Normalized embeddings for chunks [start, stop), equal to embed(chunk_text(i))"""
+        out = np.empty((stop - start, self.vocab_matrix.shape[1]), dtype=np.float32)
+        for batch_start in range(start, stop, self.EMBED_BATCH_SIZE):
+            batch_stop = min(batch_start + self.EMBED_BATCH_SIZE, stop)
+            tokens = np.stack([self._chunk_tokens(i) for i in range(batch_start, batch_stop)])
+            # One token position at a time, so the rows x words x dim gather is never built
+            vectors = out[batch_start - start:batch_stop - start]
+            vectors[:] = self.vocab_matrix[tokens[:, 0]]
+            for position in range(1, tokens.shape[1]):
+                vectors += self.vocab_matrix[tokens[:, position]]
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            vectors /= norms
+        return out
+
+    def query_text(self, index: int, words: int = 8) -> str:
+        """A query built from a handful of words of chunk ``index``"""
+        rng = np.random.default_rng((self.seed, index, 1))
+        tokens = rng.choice(self._chunk_tokens(index), size=words, replace=False)
+        return " ".join(self.vocab[tokens])
@@ -0,0 +1,219 @@
+"""
+Local stand-in for the Ollama HTTP API.
+
+Implements the endpoints the backend uses (/api/chat streaming and
+non-streaming, /api/embeddings, /api/embed and /api/tags) with simulated
+prompt-eval latency and decode speed, so the API can be load-tested without
+running llama3.2. Embeddings come from the deterministic FakeEmbedder, so RAG
+retrieval still behaves sensibly. Like Ollama, a prompt sharing a prefix with
+the model's previous prompt only pays for the rest, and a request with a
+different num_ctx reloads the model.
+
+Run from backend-fastapi/ and point the API at it:
+
+    python -m scripts.fake_ollama --port 11435 --profile cpu
+    OLLAMA_HOST=http://localhost:11435 uvicorn app.main:app --port 8000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Union
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from scripts.fake_embedder import FakeEmbedder
+
+@dataclass(frozen=True)
+class Profile:
+    load_ms: float = 0.0             # first request only, like loading the model into memory
+    prompt_tokens_per_second: float = 400.0
+    tokens_per_second: float = 12.0  # decode speed
+    embed_ms: float = 30.0
+    jitter: float = 0.1              # relative random variation on every delay
+    reply_tokens: int = 120
+    parallel: int = 1                # like OLLAMA_NUM_PARALLEL; extra requests queue
+
+PROFILES: Dict[str, Profile] = {
+    "instant": Profile(prompt_tokens_per_second=1e9, tokens_per_second=1e9, embed_ms=0.0, jitter=0.0),
+    "cpu": Profile(load_ms=3000, prompt_tokens_per_second=150, tokens_per_second=10, embed_ms=60),
+    "gpu": Profile(load_ms=1500, prompt_tokens_per_second=2500, tokens_per_second=60, embed_ms=8, parallel=4),
+}
+
+WORDS = (
+    "el tramite de residencia en Paraguay requiere pasaporte vigente certificado de "
+    "antecedentes y comprobante de domicilio la cedula se solicita en identificaciones "
+    "y el RUC se obtiene en la SET con la cedula paraguaya"
+).split()
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+def create_app(profile: Profile, models: List[str], dim: int) -> FastAPI:
+    app = FastAPI(title="Fake Ollama")
+    embedder = FakeEmbedder(dim=dim)
+    slots = asyncio.Semaphore(profile.parallel)
+    # model -> num_ctx it was loaded with; a different num_ctx reloads it
+    loaded: Dict[str, Any] = {}
+    # model -> last prompt, to simulate KV-cache reuse of a shared prefix
+    last_prompt: Dict[str, str] = {}
+
+    async def sleep(seconds: float) -> None:
+        if seconds > 0:
+            await asyncio.sleep(seconds * random.uniform(1 - profile.jitter, 1 + profile.jitter))
+
+    async def load(model: str, num_ctx: Any = None) -> int:
+        if model in loaded and loaded[model] == num_ctx:
+            return 0
+        await sleep(profile.load_ms / 1000)
+        loaded[model] = num_ctx
+        last_prompt.pop(model, None)
+        return int(profile.load_ms * 1e6)
+
+    def uncached_tokens(model: str, prompt: str) -> int:
+        previous = last_prompt.get(model, "")
+        common = len(os.path.commonprefix([previous, prompt]))
+        last_prompt[model] = prompt
+        return estimate_tokens(prompt[common:]) if common < len(prompt) else 0
+
+    def now() -> str:
+        return datetime.now(timezone.utc).isoformat()
+
+    @app.get("/api/tags")
+    async def tags() -> Any:
+        return {
+            "models": [
+                {
+                    "name": name,
+                    "model": name,
+                    "modified_at": now(),
+                    "size": 2019393189,
+                    "digest": f"fake-{abs(hash(name)):x}",
+                    "details": {"format": "gguf", "family": "fake", "parameter_size": "3B"},
+                }
+                for name in models
+            ]
+        }
+
+    @app.post("/api/chat")
+    async def chat(request: Request) -> Any:
+        body = await request.json()
+        model = body.get("model", models[0])
+        stream = body.get("stream", True)
+        prompt = "".join(m.get("content", "") for m in body.get("messages", []))
+        num_predict = (body.get("options") or {}).get("num_predict")
+        num_ctx = (body.get("options") or {}).get("num_ctx")
+        reply_tokens = min(profile.reply_tokens, num_predict) if num_predict else profile.reply_tokens
+        rng = random.Random(prompt)
+        tokens = [rng.choice(WORDS) + " " for _ in range(reply_tokens)]
+        # An empty message list only loads the model, like a keep_alive pre-warm
+        if not body.get("messages"):
+            tokens = []
+
+        async def generate():
+            async with slots:
+                start = time.perf_counter()
+                load_ns = await load(model, num_ctx)
+                evaluated = uncached_tokens(model, prompt)
+                prompt_start = time.perf_counter()
+                await sleep(evaluated / profile.prompt_tokens_per_second)
+                prompt_ns = int((time.perf_counter() - prompt_start) * 1e9)
+                eval_start = time.perf_counter()
+                for token in tokens:
+                    await sleep(1 / profile.tokens_per_second)
+                    yield {"message": {"role": "assistant", "content": token}, "done": False}
+                yield {
+                    "message": {"role": "assistant", "content": ""},
+                    "done": True,
+                    "done_reason": "stop",
+                    "total_duration": int((time.perf_counter() - start) * 1e9),
+                    "load_duration": load_ns,
+                    "prompt_eval_count": evaluated,
+                    "prompt_eval_duration": prompt_ns,
+                    "eval_count": len(tokens),
+                    "eval_duration": int((time.perf_counter() - eval_start) * 1e9),
+                }
+
+        if stream:
+            async def lines():
+                async for part in generate():
+                    yield json.dumps({"model": model, "created_at": now(), **part}) + "\n"
+            return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+        content = []
+        final: Dict[str, Any] = {}
+        async for part in generate():
+            content.append(part["message"]["content"])
+            final = part
+        final["message"] = {"role": "assistant", "content": "".join(content).strip()}
+        return {"model": model, "created_at": now(), **final}
+
+    async def embed_texts(model: str, texts: List[str]) -> Dict[str, Any]:
+        async with slots:
+            start = time.perf_counter()
+            load_ns = await load(model)
+            await sleep(profile.embed_ms / 1000 * len(texts))
+            return {
+                "embeddings": [embedder.embed(text) for text in texts],
+                "total_duration": int((time.perf_counter() - start) * 1e9),
+                "load_duration": load_ns,
+                "prompt_eval_count": sum(estimate_tokens(t) for t in texts),
+            }
+
+    @app.post("/api/embeddings")
+    async def embeddings(request: Request) -> Any:
+        body = await request.json()
+        result = await embed_texts(body.get("model", models[-1]), [body.get("prompt", "")])
+        return {"embedding": result["embeddings"][0]}
+
+    @app.post("/api/embed")
+    async def embed(request: Request) -> Any:
+        body = await request.json()
+        model = body.get("model", models[-1])
+        texts: Union[str, List[str]] = body.get("input", [])
+        if isinstance(texts, str):
+            texts = [texts]
+        return {"model": model, **await embed_texts(model, texts)}
+
+    @app.exception_handler(json.JSONDecodeError)
+    async def bad_json(request: Request, exc: json.JSONDecodeError) -> JSONResponse:
+        return JSONResponse(status_code=400, content={"error": "invalid JSON body"})
+
+    return app
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run a fake Ollama server for load testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="cpu")
+    parser.add_argument("--models", nargs="+", default=["llama3.2:latest", "nomic-embed-text:latest"])
+    parser.add_argument("--dim", type=int, default=768, help="Embedding dimension")
+    # Overrides for individual profile fields
+    parser.add_argument("--load-ms", type=float)
+    parser.add_argument("--prompt-tokens-per-second", type=float)
+    parser.add_argument("--tokens-per-second", type=float)
+    parser.add_argument("--embed-ms", type=float)
+    parser.add_argument("--jitter", type=float)
+    parser.add_argument("--reply-tokens", type=int)
+    parser.add_argument("--parallel", type=int)
+    return parser.parse_args(argv)
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    overrides = {
+        field: getattr(args, field)
+        for field in Profile.__dataclass_fields__
+        if getattr(args, field, None) is not None
+    }
+    profile = replace(PROFILES[args.profile], **overrides)
+    print(f"Fake Ollama on http://{args.host}:{args.port} with {profile}")
+    uvicorn.run(create_app(profile, args.models, args.dim), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Bulk, resumable ingestion of a directory tree of PDFs.
+
+Text is extracted in a process pool, chunked like /documents/upload-pdf,
+embedded in batches and bulk-inserted one file per transaction. A manifest of
+file hashes is written after every committed file, so an interrupted run
+resumes where it stopped and unchanged files are skipped on later runs.
+Changed files replace the chunks previously ingested for them; only chunks
+whose text changed are re-embedded.
+
+Run from backend-fastapi/:
+
+    python -m scripts.ingest_pdfs ../data/migraciones --workers 8 --batch-size 64
+    python -m scripts.ingest_pdfs ../data --rebuild-index
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from app.db.session import async_session
+from app.services.document_service import get_document_service
+
+MANIFEST_NAME = ".ingest_manifest.json"
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def extract_pdf(path: str) -> Tuple[str, int]:
+    """Runs in a worker process: (text, page count)"""
+    import fitz  # PyMuPDF
+
+    with fitz.open(path) as doc:
+        return "".join(page.get_text() for page in doc), doc.page_count
+
+def find_pdfs(root: str) -> List[str]:
+    paths = []
+    for directory, _, files in os.walk(root):
+        for name in files:
+            if name.lower().endswith(".pdf"):
+                paths.append(os.path.join(directory, name))
+    return sorted(paths)
+
+def load_manifest(path: str) -> Dict[str, Dict]:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_manifest(path: str, manifest: Dict[str, Dict]) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+class Stats:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.files = 0
+        self.skipped = 0
+        self.failed = 0
+        self.pages = 0
+        self.chunks = 0
+
+    def report(self, final: bool = False) -> str:
+        elapsed = time.perf_counter() - self.start
+        prefix = "Done" if final else "Progress"
+        return (
+            f"{prefix}: {self.files} files ({self.skipped} unchanged, {self.failed} failed), "
+            f"{self.pages} pages, {self.chunks} chunks in {elapsed:.1f}s — "
+            f"{self.pages / elapsed:.1f} pages/s, {self.chunks / elapsed:.1f} chunks/s"
+        )
+
+async def ingest_file(
+    relpath: str,
+    text: str,
+    args: argparse.Namespace,
+) -> Tuple[int, int]:
+    """
+    Replace the chunks stored for one file in a single transaction.
+    Returns (chunks, newly embedded chunks); unchanged chunks are not re-embedded.
+    """
+    async with async_session() as db:
+        counts = await get_document_service().replace_source(
+            db,
+            source_url=f"file://{relpath}",
+            title=os.path.basename(relpath),
+            content=text,
+            document_type=args.document_type,
+            batch_size=args.batch_size,
+        )
+    return counts["kept"] + counts["added"], counts["added"]
+
+async def run(args: argparse.Namespace) -> int:
+    root = os.path.abspath(args.directory)
+    manifest_path = args.manifest or os.path.join(root, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+    stats = Stats()
+
+    pending = []
+    for path in find_pdfs(root):
+        relpath = os.path.relpath(path, root)
+        sha256 = await asyncio.to_thread(file_sha256, path)
+        if manifest.get(relpath, {}).get("sha256") == sha256 and not args.force:
+            stats.skipped += 1
+            continue
+        pending.append((path, relpath, sha256))
+    print(f"{len(pending)} files to ingest, {stats.skipped} unchanged")
+
+    async def process(relpath: str, sha256: str, text: str, pages: int, error) -> None:
+        stats.files += 1
+        if error is None and not text.strip():
+            error = ValueError("no extractable text")
+        if error is None:
+            try:
+                chunks, embedded = await ingest_file(relpath, text, args)
+            except Exception as e:
+                error = e
+        if error is not None:
+            stats.failed += 1
+            print(f"  FAILED {relpath}: {error}")
+            return
+
+        stats.pages += pages
+        stats.chunks += chunks
+        manifest[relpath] = {
+            "sha256": sha256,
+            "pages": pages,
+            "chunks": chunks,
+            "ingested_at": datetime.utcnow().isoformat(),
+        }
+        save_manifest(manifest_path, manifest)
+        print(f"  {relpath}: {pages} pages, {chunks} chunks ({embedded} embedded)")
+        if stats.files % args.report_every == 0:
+            print(stats.report())
+
+    loop = asyncio.get_running_loop()
+    # Bound extracted-but-not-yet-embedded text held in memory
+    in_flight = asyncio.Semaphore(args.workers * 2)
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        async def extract(path: str, relpath: str, sha256: str):
+            # Released by the consumer once the text has been ingested
+            await in_flight.acquire()
+            try:
+                text, pages = await loop.run_in_executor(pool, extract_pdf, path)
+            except Exception as e:
+                return relpath, sha256, None, 0, e
+            return relpath, sha256, text, pages, None
+
+        for next_done in asyncio.as_completed([extract(*item) for item in pending]):
+            relpath, sha256, text, pages, error = await next_done
+            try:
+                await process(relpath, sha256, text, pages, error)
+            finally:
+                in_flight.release()
+
+    print(stats.report(final=True))
+
+    if args.rebuild_index:
+        async with async_session() as db:
+            await get_document_service().rebuild_index_file(db)
+        print("Vector index rebuilt")
+    return 1 if stats.failed else 0
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Ingest a directory tree of PDFs into the knowledge base")
+    parser.add_argument("directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="PDF extraction processes")
+    parser.add_argument("--batch-size", type=int, default=32, help="Chunks per embedding request")
+    parser.add_argument("--document-type", default="pdf")
+    parser.add_argument("--manifest", help=f"Checkpoint manifest (default: <directory>/{MANIFEST_NAME})")
+    parser.add_argument("--force", action="store_true", help="Re-ingest files even if unchanged")
+    parser.add_argument("--rebuild-index", action="store_true",
+                        help="Rewrite the shared vector index file when done")
+    parser.add_argument("--report-every", type=int, default=50, help="Print throughput every N files")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(run(parse_args())))
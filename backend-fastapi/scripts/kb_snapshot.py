@@ -0,0 +1,294 @@
+"""
+Knowledge-base snapshots: export the documents table once, seed other
+environments from it without re-embedding anything through Ollama.
+
+A snapshot is a directory of three files:
+
+    manifest.json       format, row count, embedding model, dimension and
+                        EMBEDDING_DIMENSIONS, sha256 of the other two files
+    documents.json.gz   the text and metadata columns, one JSON list per column
+    embeddings.npy      float32 matrix, one row per document in the same order
+                        (zeros where the document has no embedding, see the
+                        "embedded" column)
+
+Import verifies the files and that the snapshot was embedded with this
+environment's OLLAMA_EMBEDDING_MODEL, bulk-loads the rows with COPY (plain
+INSERTs on other databases) and either writes the shared vector index file
+straight from the matrix or deletes the now stale one.
+
+Run from backend-fastapi/ (after `alembic upgrade head` on the target):
+
+    python -m scripts.kb_snapshot export ../snapshots/2024-06-01
+    python -m scripts.kb_snapshot import ../snapshots/2024-06-01 --build-index
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import orjson
+from sqlalchemy import insert, select, text
+
+from app.core.config import settings
+from app.db.session import async_session, engine
+from app.models.document import Document
+
+SNAPSHOT_FORMAT = 1
+MANIFEST_NAME = "manifest.json"
+COLUMNS_NAME = "documents.json.gz"
+EMBEDDINGS_NAME = "embeddings.npy"
+# Every documents column except embedding_vector, which goes to the matrix
+COLUMNS = ["id", "title", "content", "source_url", "document_type", "language", "created_at", "updated_at"]
+EXPORT_BATCH_SIZE = 5000
+IMPORT_BATCH_SIZE = 5000
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def write_snapshot(
+    directory: str,
+    columns: Dict[str, List[Any]],
+    matrix: np.ndarray,
+    model: str,
+    dimensions: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Write the three snapshot files; the manifest goes last, marking it complete"""
+    os.makedirs(directory, exist_ok=True)
+    count = len(columns["id"])
+    with gzip.open(os.path.join(directory, COLUMNS_NAME), "wt", encoding="utf-8") as f:
+        json.dump({
+            name: [value.isoformat() if isinstance(value, datetime) else str(value) if isinstance(value, uuid.UUID) else value
+                   for value in values]
+            for name, values in columns.items()
+        }, f, ensure_ascii=False)
+    np.save(os.path.join(directory, EMBEDDINGS_NAME), np.asarray(matrix, dtype=np.float32))
+
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "created_at": datetime.utcnow().isoformat(),
+        "count": count,
+        "embedded": int(sum(columns["embedded"])),
+        "embedding_model": model,
+        "dim": int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+        # EMBEDDING_DIMENSIONS of the source; None means full-size vectors
+        "dimensions": dimensions,
+        "files": {name: file_sha256(os.path.join(directory, name)) for name in (COLUMNS_NAME, EMBEDDINGS_NAME)},
+    }
+    with open(os.path.join(directory, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+def read_snapshot(directory: str) -> Tuple[Dict[str, Any], Dict[str, List[Any]], np.ndarray]:
+    """(manifest, columns, matrix) with ids and timestamps parsed back; raises ValueError if damaged"""
+    with open(os.path.join(directory, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"Unsupported snapshot format {manifest.get('format')}")
+    for name, sha256 in manifest["files"].items():
+        if file_sha256(os.path.join(directory, name)) != sha256:
+            raise ValueError(f"{name} does not match the manifest checksum")
+
+    with gzip.open(os.path.join(directory, COLUMNS_NAME), "rt", encoding="utf-8") as f:
+        columns = json.load(f)
+    columns["id"] = [uuid.UUID(value) for value in columns["id"]]
+    for name in ("created_at", "updated_at"):
+        columns[name] = [datetime.fromisoformat(value) for value in columns[name]]
+    matrix = np.load(os.path.join(directory, EMBEDDINGS_NAME), mmap_mode="r")
+    if len(columns["id"]) != manifest["count"] or matrix.shape[0] != manifest["count"]:
+        raise ValueError("Row counts of the snapshot files do not match the manifest")
+    return manifest, columns, matrix
+
+def check_compatible(manifest: Dict[str, Any]) -> Optional[str]:
+    """Why this environment cannot use the snapshot's embeddings, or None"""
+    if manifest["embedding_model"] != settings.OLLAMA_EMBEDDING_MODEL:
+        return (f"snapshot was embedded with {manifest['embedding_model']}, "
+                f"this environment uses {settings.OLLAMA_EMBEDDING_MODEL}")
+    if not manifest["embedded"]:
+        return None
+    # Stored vectors are already truncated, so the target can only truncate them further
+    if settings.EMBEDDING_DIMENSIONS:
+        if manifest["dim"] < settings.EMBEDDING_DIMENSIONS:
+            return f"snapshot vectors have {manifest['dim']} dimensions, EMBEDDING_DIMENSIONS is {settings.EMBEDDING_DIMENSIONS}"
+    elif manifest.get("dimensions"):
+        return (f"snapshot vectors were truncated to {manifest['dimensions']} dimensions and this environment "
+                f"uses full-size ones; set EMBEDDING_DIMENSIONS={manifest['dimensions']} or lower")
+    return None
+
+def grow_matrix(matrix: np.ndarray, rows: int) -> np.ndarray:
+    """matrix with at least `rows` rows; new rows are zero"""
+    if rows <= len(matrix):
+        return matrix
+    grown = np.zeros((max(rows, len(matrix) * 5 // 4), matrix.shape[1]), dtype=np.float32)
+    grown[:len(matrix)] = matrix
+    return grown
+
+async def export_snapshot(args: argparse.Namespace) -> int:
+    start = time.perf_counter()
+    columns: Dict[str, List[Any]] = {name: [] for name in COLUMNS + ["embedded"]}
+    # Allocated at the first embedding, sized by the count(*) pre-pass; grows
+    # only if rows are inserted while the export runs
+    matrix: Optional[np.ndarray] = None
+    count = 0
+
+    table = Document.__table__
+    async with async_session() as db:
+        expected = (await db.execute(text("SELECT count(*) FROM documents"))).scalar() or 0
+        result = await db.stream(
+            select(*[table.c[name] for name in COLUMNS], table.c.embedding_vector)
+            .order_by(table.c.created_at, table.c.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        async for row in result:
+            for name in COLUMNS:
+                columns[name].append(getattr(row, name))
+            embedding = row.embedding_vector
+            columns["embedded"].append(bool(embedding))
+            if embedding:
+                if matrix is None:
+                    matrix = np.zeros((max(expected, count + 1), len(embedding)), dtype=np.float32)
+                elif len(embedding) != matrix.shape[1]:
+                    print(f"Stored embeddings have mixed dimensions ({matrix.shape[1]} and {len(embedding)}); "
+                          "re-embed before exporting")
+                    return 1
+                matrix = grow_matrix(matrix, count + 1)
+                matrix[count] = embedding
+            count += 1
+
+    matrix = np.zeros((count, 0), dtype=np.float32) if matrix is None else grow_matrix(matrix, count)[:count]
+    manifest = write_snapshot(
+        args.directory, columns, matrix, settings.OLLAMA_EMBEDDING_MODEL, settings.EMBEDDING_DIMENSIONS
+    )
+    size_mb = sum(os.path.getsize(os.path.join(args.directory, name)) for name in manifest["files"]) / 2**20
+    print(
+        f"Exported {manifest['count']} documents ({manifest['embedded']} embedded, dim {manifest['dim']}, "
+        f"{manifest['embedding_model']}) to {args.directory}: {size_mb:.1f}MB in {time.perf_counter() - start:.1f}s"
+    )
+    return 0
+
+def snapshot_rows(columns: Dict[str, List[Any]], matrix: np.ndarray) -> Iterator[Dict[str, Any]]:
+    for i in range(len(columns["id"])):
+        row = {name: columns[name][i] for name in COLUMNS}
+        row["embedding_vector"] = matrix[i].tolist() if columns["embedded"][i] else None
+        yield row
+
+async def load_rows(columns: Dict[str, List[Any]], matrix: np.ndarray, replace: bool) -> None:
+    """Load every row in one transaction, with COPY on Postgres"""
+    names = COLUMNS + ["embedding_vector"]
+    async with engine.begin() as conn:
+        existing = (await conn.execute(text("SELECT count(*) FROM documents"))).scalar()
+        if existing and not replace:
+            raise ValueError(f"documents already has {existing} rows; pass --replace to overwrite them")
+        if existing:
+            await conn.execute(text("DELETE FROM documents"))
+
+        if engine.dialect.name == "postgresql":
+            raw = await conn.get_raw_connection()
+            # embedding_vector is a json column; asyncpg takes it as text
+            records = (
+                tuple(orjson.dumps(row[name]).decode() if name == "embedding_vector" and row[name] is not None else row[name]
+                      for name in names)
+                for row in snapshot_rows(columns, matrix)
+            )
+            await raw.driver_connection.copy_records_to_table("documents", records=records, columns=names)
+        else:
+            batch = []
+            for row in snapshot_rows(columns, matrix):
+                batch.append(row)
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    await conn.execute(insert(Document.__table__), batch)
+                    batch = []
+            if batch:
+                await conn.execute(insert(Document.__table__), batch)
+
+def build_index(columns: Dict[str, List[Any]], matrix: np.ndarray) -> int:
+    """Write VECTOR_INDEX_PATH from the snapshot matrix, as rebuild_index_file would from the table"""
+    from app.services.vector_index import write_index_file
+
+    embedded = np.flatnonzero(np.asarray(columns["embedded"], dtype=bool))
+    vectors = np.asarray(matrix[embedded], dtype=np.float32)
+    if settings.EMBEDDING_DIMENSIONS:
+        # Matryoshka truncation; write_index_file renormalizes the rows
+        vectors = vectors[:, :settings.EMBEDDING_DIMENSIONS]
+    watermark = max((columns["updated_at"][i] for i in embedded), default=None)
+    write_index_file(
+        settings.VECTOR_INDEX_PATH,
+        [columns["id"][i] for i in embedded],
+        vectors,
+        settings.OLLAMA_EMBEDDING_MODEL,
+        watermark,
+        settings.EMBEDDING_DIMENSIONS,
+    )
+    return len(embedded)
+
+async def import_snapshot(args: argparse.Namespace) -> int:
+    start = time.perf_counter()
+    try:
+        manifest, columns, matrix = read_snapshot(args.directory)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Cannot read snapshot {args.directory}: {e}")
+        return 1
+    problem = check_compatible(manifest)
+    if problem:
+        print(f"Incompatible snapshot: {problem}")
+        return 1
+
+    try:
+        await load_rows(columns, matrix, args.replace)
+    except ValueError as e:
+        print(e)
+        return 1
+    print(f"Loaded {manifest['count']} documents ({manifest['embedded']} embedded) in {time.perf_counter() - start:.1f}s")
+
+    if not settings.VECTOR_INDEX_PATH:
+        if args.build_index:
+            print("VECTOR_INDEX_PATH is not set; workers build their index from the table")
+        return 0
+    await replace_index_file(columns, matrix, args.build_index)
+    # Rows were loaded without change events; running workers pick them up on restart
+    return 0
+
+async def replace_index_file(columns: Dict[str, List[Any]], matrix: np.ndarray, build: bool) -> None:
+    """
+    The old index file describes the rows that were just replaced: rewrite it
+    from the snapshot, or delete it so the next worker rebuilds it from the table.
+    """
+    from app.services.vector_index import index_file_lock
+
+    path = settings.VECTOR_INDEX_PATH
+    async with index_file_lock(path):
+        if build:
+            count = await asyncio.to_thread(build_index, columns, matrix)
+            print(f"Wrote vector index {path} with {count} vectors")
+        elif os.path.exists(path):
+            os.remove(path)
+            print(f"Removed stale vector index {path}; workers rebuild it from the table on start")
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Export or import a knowledge-base snapshot of the documents table")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="Write the documents table to a snapshot directory")
+    export_parser.add_argument("directory")
+
+    import_parser = commands.add_parser("import", help="Bulk-load a snapshot into an empty documents table")
+    import_parser.add_argument("directory")
+    import_parser.add_argument("--replace", action="store_true", help="Delete existing documents first")
+    import_parser.add_argument("--build-index", action="store_true",
+                               help="Write the shared vector index file from the snapshot")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    sys.exit(asyncio.run(export_snapshot(args) if args.command == "export" else import_snapshot(args)))
@@ -0,0 +1,156 @@
+"""
+End-to-end load generator for the API.
+
+Runs a fixed number of concurrent workers against /chat/, /documents/ and
+/documents/upload-pdf with a weighted request mix, then reports throughput and
+latency percentiles per endpoint. Pair it with scripts/fake_ollama.py to
+measure the API itself rather than the model:
+
+    python -m scripts.fake_ollama --profile gpu &
+    OLLAMA_HOST=http://localhost:11435 uvicorn app.main:app --port 8000 --workers 4 &
+    python -m scripts.loadgen --concurrency 32 --duration 60 --mix chat=8,documents=1,upload=1
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List
+
+import httpx
+import numpy as np
+
+QUESTIONS = [
+    "¿Qué documentos necesito para la residencia temporal en Paraguay?",
+    "Como faço para tirar o RUC no Paraguai?",
+    "¿Cómo abro una cuenta bancaria en Asunción?",
+    "Quanto custa a cédula paraguaia para brasileiros?",
+    "¿Dónde pago la factura de la ANDE?",
+]
+
+class Scenario:
+    def __init__(self, args: argparse.Namespace):
+        self.api = args.api_prefix
+        self.pdf = open(args.pdf, "rb").read() if "upload" in args.mix else b""
+        self.counter = 0
+
+    async def chat(self, client: httpx.AsyncClient) -> httpx.Response:
+        payload = {"message": random.choice(QUESTIONS), "chat_history": []}
+        return await client.post(f"{self.api}/chat/", json=payload)
+
+    async def documents(self, client: httpx.AsyncClient) -> httpx.Response:
+        self.counter += 1
+        payload = {
+            "title": f"Load test fact {self.counter}",
+            "content": f"Dato de prueba de carga número {self.counter}: " + random.choice(QUESTIONS),
+            "document_type": "loadtest",
+            "source_url": "loadtest://documents",
+        }
+        return await client.post(f"{self.api}/documents/", json=payload)
+
+    async def upload(self, client: httpx.AsyncClient) -> httpx.Response:
+        self.counter += 1
+        files = {"file": (f"loadtest-{self.counter}.pdf", self.pdf, "application/pdf")}
+        return await client.post(f"{self.api}/documents/upload-pdf", files=files)
+
+    def endpoints(self) -> Dict[str, Callable]:
+        return {"chat": self.chat, "documents": self.documents, "upload": self.upload}
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+def summarize(name: str, latencies: List[float], errors: int, elapsed: float) -> Dict:
+    ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        "endpoint": name,
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(float(np.percentile(ms, 50)), 1),
+        "p90_ms": round(float(np.percentile(ms, 90)), 1),
+        "p99_ms": round(float(np.percentile(ms, 99)), 1),
+        "max_ms": round(float(ms.max()), 1),
+    }
+
+async def run(args: argparse.Namespace) -> List[Dict]:
+    scenario = Scenario(args)
+    endpoints = scenario.endpoints()
+    unknown = set(args.mix) - set(endpoints)
+    if unknown:
+        raise SystemExit(f"Unknown endpoints in --mix: {', '.join(sorted(unknown))}")
+    names = list(args.mix)
+    weights = [args.mix[n] for n in names]
+
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    deadline = time.perf_counter() + args.duration
+    remaining = args.requests
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        nonlocal remaining
+        while time.perf_counter() < deadline:
+            if remaining is not None:
+                if remaining <= 0:
+                    return
+                remaining -= 1
+            name = random.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                response = await endpoints[name](client)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            latencies[name].append(time.perf_counter() - start)
+            if failed:
+                errors[name] += 1
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, headers=headers, limits=limits, timeout=args.timeout) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+
+    results = [summarize(n, latencies[n], errors[n], elapsed) for n in names if latencies[n]]
+    all_latencies = [l for n in names for l in latencies[n]]
+    results.append(summarize("total", all_latencies, sum(errors.values()), elapsed))
+    return results
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load test the Paraguay Guide API")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--api-prefix", default="/api/v1")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    parser.add_argument("--requests", type=int, help="Stop after this many requests")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("chat=8,documents=1,upload=1"),
+                        help="Weighted endpoint mix, e.g. chat=8,documents=1,upload=1")
+    parser.add_argument("--pdf", default="test.pdf", help="PDF used for upload requests")
+    parser.add_argument("--token", help="Bearer token sent with every request")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    return parser.parse_args(argv)
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    results = asyncio.run(run(args))
+
+    print(f"{'endpoint':>10} {'reqs':>7} {'errs':>6} {'req/s':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}")
+    for r in results:
+        print(
+            f"{r['endpoint']:>10} {r['requests']:>7} {r['errors']:>6} {r['throughput_rps']:>8} "
+            f"{r['p50_ms']:>8} {r['p90_ms']:>8} {r['p99_ms']:>8} {r['max_ms']:>8}"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"config": {k: v for k, v in vars(args).items() if k != "token"}, "results": results}, f, indent=2)
+    return 1 if results[-1]["errors"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
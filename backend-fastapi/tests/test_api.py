@@ -14,3 +14,26 @@ def test_chat_status():
     data = response.json()
     assert "status" in data
     assert "ollama_available" in data
+
+def test_list_documents_pages_without_embeddings():
+    response = client.get("/api/v1/documents/", params={"limit": 2})
+    assert response.status_code == 200
+    page = response.json()
+    assert len(page["items"]) <= 2
+    assert all("embedding_vector" not in item for item in page["items"])
+
+    if page["next_cursor"]:
+        response = client.get("/api/v1/documents/", params={"limit": 2, "cursor": page["next_cursor"], "fields": "id,title"})
+        assert response.status_code == 200
+        next_page = response.json()
+        assert all(set(item) == {"id", "title"} for item in next_page["items"])
+        assert not {item["id"] for item in next_page["items"]} & {item["id"] for item in page["items"]}
+
+def test_list_documents_rejects_unknown_fields():
+    response = client.get("/api/v1/documents/", params={"fields": "id,password"})
+    assert response.status_code == 400
+
+def test_chat_treats_invalid_token_as_anonymous():
+    # An expired or invalid token must not turn the open chat endpoint into a 403
+    response = client.post("/api/v1/chat/", json={"message": ""}, headers={"Authorization": "Bearer not-a-jwt"})
+    assert response.status_code == 400
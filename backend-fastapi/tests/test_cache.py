@@ -0,0 +1,83 @@
+import asyncio
+import time
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api import deps
+from app.core import security
+from app.core.cache import TTLCache
+from app.models.user import User
+
+def test_lru_eviction():
+    cache = TTLCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" becomes most recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+def test_ttl_expiry():
+    cache = TTLCache(max_size=10, ttl=0.05)
+    cache.set("user", "alice")
+    assert cache.get("user") == "alice"
+    time.sleep(0.06)
+    assert cache.get("user") is None
+    assert len(cache) == 0
+
+def test_invalidate():
+    cache = TTLCache(max_size=10, ttl=60)
+    cache.set("user", "alice")
+    cache.invalidate("user")
+    assert cache.get("user") is None
+    assert cache.misses == 1
+
+def test_get_current_user_caches_and_invalidates_on_change(tmp_path, monkeypatch):
+    user = User(id=uuid.uuid4(), username="ana", email="ana@example.com", hashed_password="x")
+    token = security.create_access_token(user.id)
+    opened = []
+
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'users.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(User.metadata.create_all, tables=[User.__table__])
+        session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        def counting_session():
+            opened.append(True)
+            return session()
+
+        monkeypatch.setattr(deps, "async_session", counting_session)
+        monkeypatch.setattr(deps, "user_cache", TTLCache(max_size=10, ttl=60))
+        async with session() as db:
+            db.add(user)
+            await db.commit()
+
+        first = await deps.get_current_user(token)
+        second = await deps.get_current_user(token)
+        assert first.id == user.id and second is first
+        assert len(opened) == 1  # the second request skipped the query
+
+        # after_update drops the cached row, so the change is seen at once
+        async with session() as db:
+            stored = await db.get(User, user.id)
+            stored.is_premium = True
+            await db.commit()
+        assert (await deps.get_current_user(token)).is_premium
+        assert len(opened) == 2
+
+        # after_delete does too: the next request is rejected
+        async with session() as db:
+            await db.delete(await db.get(User, user.id))
+            await db.commit()
+        with pytest.raises(HTTPException) as rejected:
+            await deps.get_current_user(token)
+        assert rejected.value.status_code == 404
+        await engine.dispose()
+
+    asyncio.run(run())
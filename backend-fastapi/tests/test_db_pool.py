@@ -0,0 +1,16 @@
+from sqlalchemy import text
+
+from app.db.session import make_sync_engine, pool_checkout_wait, pool_in_use
+
+def test_sync_engine_reports_pool_metrics(tmp_path):
+    engine = make_sync_engine(f"sqlite:///{tmp_path / 'pool.db'}")
+    in_use = pool_in_use.value(engine="sync")
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        assert pool_in_use.value(engine="sync") == in_use + 1
+    assert pool_in_use.value(engine="sync") == in_use
+
+    assert any(name.startswith("db_pool_checkout_wait_seconds_count{engine=\"sync\"}")
+               for name in pool_checkout_wait.samples())
+    engine.dispose()
@@ -0,0 +1,113 @@
+import asyncio
+import json
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.models.document import Document
+from app.services.document_events import WORKER_ID, coalesce_events
+from app.services.document_service import DocumentService
+
+def event(origin: str, upserted=(), deleted=()) -> str:
+    return json.dumps({"origin": origin, "upserted": [str(i) for i in upserted], "deleted": [str(i) for i in deleted]})
+
+def test_last_event_for_an_id_wins():
+    a, b, c = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    upserted, deleted = coalesce_events([
+        event("other", upserted=[a, b]),
+        event("other", deleted=[a, c]),
+        event("other", upserted=[c]),
+    ])
+    assert set(upserted) == {b, c}
+    assert deleted == [a]
+
+def test_own_and_malformed_events_are_skipped():
+    own = uuid.uuid4()
+    assert coalesce_events([event(WORKER_ID, upserted=[own]), "not json"]) == ([], [])
+
+def make_doc(title: str, embedding, updated_at: datetime) -> Document:
+    return Document(id=uuid.uuid4(), title=title, content=title, document_type="fact",
+                    embedding_vector=embedding, created_at=updated_at, updated_at=updated_at)
+
+async def sqlite_session(tmp_path, monkeypatch):
+    """A SQLite-backed async_session for the service's own sessions"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'docs.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Document.metadata.create_all, tables=[Document.__table__])
+    session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr("app.db.session.async_session", session)
+    return engine, session
+
+def test_apply_changes_updates_index_and_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "VECTOR_INDEX_PATH", "")
+    monkeypatch.setattr(settings, "EMBEDDING_DIMENSIONS", None)
+    now = datetime.utcnow()
+    kept, edited, vanished, removed = (make_doc(name, [1.0, 0.0, 0.0], now) for name in ("kept", "edited", "vanished", "removed"))
+    added = make_doc("added", [0.0, 0.0, 1.0], now)
+
+    async def run():
+        engine, session = await sqlite_session(tmp_path, monkeypatch)
+        service = DocumentService()
+        async with session() as db:
+            db.add_all([kept, edited, vanished, removed])
+            await db.commit()
+            await service.load_index(db)
+            for doc in (kept, edited, vanished, removed):
+                service.content_cache.set(doc.id, doc)
+
+            # Another worker edits one row, deletes two and inserts one
+            edited.embedding_vector, edited.updated_at = [0.0, 1.0, 0.0], now + timedelta(seconds=1)
+            await db.delete(vanished)
+            await db.delete(removed)
+            db.add(added)
+            await db.commit()
+
+        upserted, deleted = coalesce_events([
+            # Our own event is skipped: kept stays indexed
+            event(WORKER_ID, deleted=[kept.id]),
+            # vanished was deleted again before this worker read it
+            event("other", upserted=[edited.id, vanished.id, added.id], deleted=[removed.id]),
+        ])
+        await service.apply_changes(upserted, deleted)
+        await engine.dispose()
+        return service
+
+    service = asyncio.run(run())
+    assert len(service.index) == 3
+    assert {kept.id, edited.id, added.id} == {doc_id for doc_id, _ in service.index.search([1.0, 1.0, 1.0], 10)}
+    assert service.index.search([0.0, 1.0, 0.0], 1)[0][0] == edited.id
+    assert service.content_cache.get(kept.id) is kept
+    assert all(service.content_cache.get(doc.id) is None for doc in (edited, vanished, removed))
+
+def test_catch_up_applies_changes_missed_while_disconnected(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "VECTOR_INDEX_PATH", "")
+    monkeypatch.setattr(settings, "EMBEDDING_DIMENSIONS", None)
+    monkeypatch.setattr(settings, "RETRIEVAL_MODE", "index")
+    now = datetime.utcnow()
+    kept, deleted = make_doc("kept", [1.0, 0.0], now), make_doc("deleted", [0.0, 1.0], now)
+    added = make_doc("added", [0.5, 0.5], now + timedelta(seconds=1))
+
+    async def run():
+        engine, session = await sqlite_session(tmp_path, monkeypatch)
+        service = DocumentService()
+        async with session() as db:
+            db.add_all([kept, deleted])
+            await db.commit()
+            await service.load_index(db)
+            service.content_cache.set(kept.id, kept)
+
+            # Written by another worker while the listener was down
+            await db.delete(deleted)
+            db.add(added)
+            await db.commit()
+
+        await service.catch_up()
+        await engine.dispose()
+        return service
+
+    service = asyncio.run(run())
+    assert {doc_id for doc_id, _ in service.index.search([1.0, 1.0], 10)} == {kept.id, added.id}
+    assert service.content_cache.get(kept.id) is None
@@ -0,0 +1,15 @@
+import math
+
+from app.services.ollama_service import truncate_embedding
+
+def test_truncation_keeps_prefix_and_renormalizes():
+    embedding = [3.0, 4.0, 12.0]
+    truncated = truncate_embedding(embedding, 2)
+    assert truncated == [0.6, 0.8]
+    assert math.isclose(sum(x * x for x in truncated), 1.0)
+
+def test_truncation_is_a_no_op_when_unset_or_short():
+    embedding = [0.1, 0.2]
+    assert truncate_embedding(embedding, None) is embedding
+    assert truncate_embedding(embedding, 4) is embedding
+    assert truncate_embedding([], 2) == []
@@ -0,0 +1,26 @@
+from app.core.config import settings
+from app.models.document import Document
+from app.services.fast_path import decide, extract_answer
+
+def _doc(content: str, document_type: str = "faq") -> Document:
+    return Document(title="RUC", content=content, document_type=document_type)
+
+def test_extract_answer_takes_the_answer_part_and_cuts_at_a_sentence():
+    content = "P: ¿Cómo saco el RUC?\nR: Con cédula paraguaya. Se pide en la SET. Tarda un día."
+    assert extract_answer(content, 800) == "Con cédula paraguaya. Se pide en la SET. Tarda un día."
+    assert extract_answer(content, 45) == "Con cédula paraguaya. Se pide en la SET."
+    assert extract_answer("Sin etiquetas.", 800) == "Sin etiquetas."
+
+def test_only_close_curated_matches_skip_generation(monkeypatch):
+    monkeypatch.setattr(settings, "CHAT_FAST_PATH_ENABLED", True)
+    monkeypatch.setattr(settings, "CHAT_FAST_PATH_MIN_SCORE", 0.85)
+    faq = _doc("P: ¿Horario?\nR: De 7 a 13.")
+
+    assert decide([(0.9, faq), (0.95, _doc("Artículo", "article"))]).decision == "not_curated"
+    assert decide([(0.8, faq)]).decision == "below_threshold"
+    assert decide([]).decision == "no_match"
+    hit = decide([(0.9, faq), (0.5, _doc("Otro"))])
+    assert hit.decision == "extractive" and hit.answer == "De 7 a 13." and hit.document is faq
+
+    monkeypatch.setattr(settings, "CHAT_FAST_PATH_ENABLED", False)
+    assert decide([(0.99, faq)]).answer is None
@@ -0,0 +1,122 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.models.document import Document
+from app.services.document_service import DocumentService
+from app.services.vector_index import MmapVectorIndex
+
+def test_freshly_written_index_file_loads_with_empty_overlay(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "VECTOR_INDEX_PATH", str(tmp_path / "index.bin"))
+    monkeypatch.setattr(settings, "EMBEDDING_DIMENSIONS", None)
+    rng = np.random.default_rng(0)
+    now = datetime.utcnow()
+
+    def doc(i: int, updated_at: datetime) -> Document:
+        return Document(
+            id=uuid.uuid4(), title=f"Doc {i}", content=f"Chunk {i}", document_type="fact",
+            embedding_vector=rng.normal(size=8).tolist(), created_at=updated_at, updated_at=updated_at,
+        )
+
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'docs.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Document.metadata.create_all, tables=[Document.__table__])
+        session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        service = DocumentService()
+        async with session() as db:
+            # A bulk insert: every row within the refresh overlap of the file's watermark
+            db.add_all([doc(i, now - timedelta(milliseconds=i)) for i in range(300)])
+            await db.commit()
+            await service.rebuild_index_file(db)
+            await service._load_index(db)
+            loaded = service.index
+            overlay_after_load = len(loaded.overlay)
+
+            db.add(doc(300, now + timedelta(seconds=1)))
+            await db.commit()
+            await service._refresh_index(db)
+        await engine.dispose()
+        return loaded, overlay_after_load
+
+    index, overlay_after_load = asyncio.run(run())
+    assert isinstance(index, MmapVectorIndex)
+    assert overlay_after_load == 0
+    assert len(index.overlay) == 1 and len(index) == 301
+
+def test_refresh_drops_cached_content_of_rows_edited_elsewhere(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "VECTOR_INDEX_PATH", "")
+    monkeypatch.setattr(settings, "EMBEDDING_DIMENSIONS", None)
+    now = datetime.utcnow()
+
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'docs.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Document.metadata.create_all, tables=[Document.__table__])
+        session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        service = DocumentService()
+        doc = Document(id=uuid.uuid4(), title="Old", content="Old", document_type="fact",
+                       embedding_vector=[1.0, 0.0], created_at=now, updated_at=now)
+        async with session() as db:
+            db.add(doc)
+            await db.commit()
+            await service._load_index(db)
+            service.content_cache.set(doc.id, doc)
+
+            # Another worker edits the row; no change event arrives
+            doc.title, doc.embedding_vector, doc.updated_at = "New", [0.0, 1.0], now + timedelta(seconds=1)
+            await db.commit()
+            await service._refresh_index(db)
+        await engine.dispose()
+        return service, doc.id
+
+    service, doc_id = asyncio.run(run())
+    assert service.content_cache.get(doc_id) is None
+    assert service.index.search([0.0, 1.0], 1)[0][0] == doc_id
+
+def test_refresh_removes_rows_deleted_elsewhere(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "VECTOR_INDEX_PATH", str(tmp_path / "index.bin"))
+    monkeypatch.setattr(settings, "EMBEDDING_DIMENSIONS", None)
+    now = datetime.utcnow()
+    docs = [
+        Document(id=uuid.uuid4(), title=f"Doc {i}", content=f"Chunk {i}", document_type="fact",
+                 embedding_vector=[float(i == j) for j in range(4)], created_at=now, updated_at=now)
+        for i in range(4)
+    ]
+
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'docs.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Document.metadata.create_all, tables=[Document.__table__])
+        session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        service = DocumentService()
+        async with session() as db:
+            db.add_all(docs[:3])
+            await db.commit()
+            await service.rebuild_index_file(db)
+            await service._load_index(db)
+            db.add(docs[3])
+            await db.commit()
+            await service._refresh_index(db)
+            assert len(service.index) == 4 and len(service.index.overlay) == 1
+
+            # Another worker deletes a base row and an overlay row; no change event arrives
+            await db.delete(docs[0])
+            await db.delete(docs[3])
+            await db.commit()
+            await service._refresh_index(db)
+        await engine.dispose()
+        return service.index
+
+    index = asyncio.run(run())
+    assert len(index) == 2 and len(index.overlay) == 0
+    found = {doc_id for doc_id, _ in index.search([1.0, 1.0, 1.0, 1.0], 4)}
+    assert found == {docs[1].id, docs[2].id}
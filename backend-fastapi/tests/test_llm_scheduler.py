@@ -0,0 +1,52 @@
+import asyncio
+
+from app.services.llm_scheduler import LLMScheduler, QueueFull
+
+def test_heavy_user_does_not_starve_others_and_premium_goes_first():
+    async def run():
+        scheduler = LLMScheduler(capacity=1, premium_weight=4.0, user_max_concurrency=1, max_queue=100)
+        order = []
+        gate = asyncio.Event()
+
+        async def request(user: str, premium: bool = False):
+            async with scheduler.slot(user, premium) as ticket:
+                order.append(user)
+                if not gate.is_set():
+                    await gate.wait()
+                return ticket
+
+        # "heavy" holds the only slot, then queues more requests before the others arrive
+        tasks = [asyncio.create_task(request("heavy"))]
+        await asyncio.sleep(0)
+        tasks += [asyncio.create_task(request("heavy")) for _ in range(3)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(request("light")))
+        tasks.append(asyncio.create_task(request("vip", premium=True)))
+        await asyncio.sleep(0)
+        gate.set()
+        tickets = await asyncio.gather(*tasks)
+        return order, tickets, scheduler
+
+    order, tickets, scheduler = asyncio.run(run())
+    assert order[0] == "heavy"
+    assert order.index("vip") < order.index("light") < 4
+    assert tickets[-1].position < tickets[3].position
+    assert scheduler.running_count == 0 and not scheduler.queue
+
+def test_full_queue_is_rejected():
+    async def run():
+        scheduler = LLMScheduler(capacity=1, premium_weight=4.0, user_max_concurrency=1, max_queue=1)
+        async with scheduler.slot("a"):
+            waiting = asyncio.create_task(scheduler.slot("b").__aenter__())
+            await asyncio.sleep(0)
+            try:
+                async with scheduler.slot("c"):
+                    pass
+            except QueueFull:
+                rejected = True
+            else:
+                rejected = False
+            waiting.cancel()
+            return rejected
+
+    assert asyncio.run(run())
@@ -0,0 +1,38 @@
+import asyncio
+import uuid
+
+from fastapi.testclient import TestClient
+
+from app.core import security
+from app.core.config import settings
+from app.main import app
+
+client = TestClient(app)
+
+def test_login_is_rejected_with_503_when_no_slot_frees_up(monkeypatch):
+    email = f"login-{uuid.uuid4().hex[:8]}@example.com"
+    response = client.post("/api/v1/users/", json={"username": email, "email": email, "password": "secret-password"})
+    assert response.status_code == 201
+
+    # Every slot taken by logins that never finish
+    monkeypatch.setattr(security, "login_slots", asyncio.Semaphore(0))
+    monkeypatch.setattr(settings, "LOGIN_QUEUE_TIMEOUT_SECONDS", 0.05)
+    response = client.post("/api/v1/login/access-token", data={"username": email, "password": "secret-password"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+def test_verify_and_update_rehashes_other_rounds(monkeypatch):
+    try:
+        monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 5)
+        security.get_pwd_context.cache_clear()
+        old_hash = security.get_password_hash("secret-password")
+
+        monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 4)
+        security.get_pwd_context.cache_clear()
+        valid, new_hash = asyncio.run(security.verify_and_update_password("secret-password", old_hash))
+        assert valid and new_hash.startswith("$2b$04$")
+
+        assert asyncio.run(security.verify_and_update_password("secret-password", new_hash)) == (True, None)
+        assert asyncio.run(security.verify_and_update_password("wrong-password", old_hash)) == (False, None)
+    finally:
+        security.get_pwd_context.cache_clear()
@@ -0,0 +1,25 @@
+import asyncio
+
+import pytest
+
+from app.core.ndjson import LineTooLong, iter_lines
+
+async def chunks(*parts: bytes):
+    for part in parts:
+        yield part
+
+def collect(*parts: bytes, max_line_bytes: int = 100):
+    async def run():
+        return [item async for item in iter_lines(chunks(*parts), max_line_bytes)]
+    return asyncio.run(run())
+
+def test_lines_split_across_chunks():
+    assert collect(b'{"a": 1}\n{"b"', b': 2}\n\n{"c": 3}') == [
+        (1, b'{"a": 1}'),
+        (2, b'{"b": 2}'),
+        (4, b'{"c": 3}'),
+    ]
+
+def test_unterminated_long_line_is_rejected():
+    with pytest.raises(LineTooLong):
+        collect(b"x" * 60, b"x" * 60, max_line_bytes=100)
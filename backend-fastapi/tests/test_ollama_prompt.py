@@ -0,0 +1,35 @@
+from app.core.config import settings
+from app.services.ollama_service import OllamaService
+
+def make_service() -> OllamaService:
+    # No client needed for message assembly
+    service = OllamaService.__new__(OllamaService)
+    service.system_prompt = "Eres un asistente."
+    service._prompt_seconds_per_token = None
+    return service
+
+def history(n: int):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"m{i}"} for i in range(n)]
+
+def test_prefix_is_stable_between_window_steps():
+    service = make_service()
+    first = service.build_messages("q1", history(12), context=[("Doc", "texto")])
+    second = service.build_messages("q2", history(13), context=[("Otro", "otro texto")])
+    # Everything before the previous request's last message is reused verbatim
+    assert second[:len(first) - 1] == first[:-1]
+    assert len(first) - 2 <= settings.OLLAMA_HISTORY_MESSAGES
+    assert "Documento: Doc" in first[-1]["content"] and first[-1]["role"] == "user"
+
+def test_num_ctx_is_bucketed():
+    service = make_service()
+    assert service.num_ctx_for(10) == settings.OLLAMA_MIN_CTX
+    assert service.num_ctx_for(settings.OLLAMA_MIN_CTX) == settings.OLLAMA_MIN_CTX * 2
+    assert service.num_ctx_for(10 ** 6) == settings.OLLAMA_MAX_CTX
+
+def test_cached_prompt_tokens_are_reported():
+    service = make_service()
+    stats = service._prompt_stats({"prompt_eval_count": 100, "prompt_eval_duration": 200_000_000}, 100, 2048)
+    assert stats["cached_prompt_tokens"] == 0
+    stats = service._prompt_stats({"prompt_eval_count": 20, "prompt_eval_duration": 40_000_000}, 120, 2048)
+    assert stats["cached_prompt_tokens"] == 100
+    assert stats["prompt_eval_saved_ms"] == 200.0
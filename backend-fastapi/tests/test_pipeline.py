@@ -0,0 +1,83 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.pipeline import Stage, StageTimeout, run_stages
+
+def test_independent_stages_overlap_and_slow_ones_fall_back():
+    async def slow(value, delay):
+        await asyncio.sleep(delay)
+        return value
+
+    async def combine(a, b, c):
+        return (a, b, c)
+
+    start = time.perf_counter()
+    results = asyncio.run(run_stages("test", [
+        Stage("a", lambda: slow(1, 0.1)),
+        Stage("b", lambda: slow(2, 0.1)),
+        Stage("c", lambda: slow(3, 5.0), timeout=0.15, fallback=None),
+        Stage("combined", combine, after=["a", "b", "c"]),
+    ]))
+    elapsed = time.perf_counter() - start
+
+    assert results.values["combined"] == (1, 2, None)
+    assert results.degraded == {"c": "timeout"}
+    assert elapsed < 0.5
+
+def test_required_stage_failure_cancels_the_rest():
+    cancelled = []
+
+    async def fail():
+        raise RuntimeError("down")
+
+    async def long():
+        try:
+            await asyncio.sleep(5.0)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def never(long):
+        return long
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(run_stages("test", [Stage("health", fail), Stage("long", long), Stage("after", never, after=["long"])]))
+    assert cancelled
+
+    async def hang():
+        await asyncio.sleep(5.0)
+
+    with pytest.raises(StageTimeout):
+        asyncio.run(run_stages("test", [Stage("health", hang, timeout=0.05)]))
+
+def test_failure_waits_for_cancelled_stages_to_unwind():
+    cleaned_up = []
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("down")
+
+    async def slow_cleanup():
+        try:
+            await asyncio.sleep(5.0)
+        except asyncio.CancelledError:
+            await asyncio.sleep(0.01)
+            cleaned_up.append(True)
+            raise
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            await run_stages("test", [Stage("health", fail), Stage("other", slow_cleanup)])
+        # Finished before run_stages re-raised, not at loop shutdown
+        return list(cleaned_up)
+
+    assert asyncio.run(main()) == [True]
+
+def test_dependencies_must_be_listed_first():
+    async def noop(**_):
+        return None
+
+    with pytest.raises(ValueError):
+        asyncio.run(run_stages("test", [Stage("b", noop, after=["a"]), Stage("a", noop)]))
@@ -0,0 +1,46 @@
+import cProfile
+import pstats
+from datetime import datetime
+
+from app.core.profiling import Profile, ProfileStore
+
+def _work(n: int) -> int:
+    return sum(_leaf(i) for i in range(n))
+
+def _leaf(i: int) -> int:
+    return sum(range(i % 50))
+
+def _profile(profile_id: str = "p1") -> Profile:
+    profiler = cProfile.Profile()
+    profiler.enable()
+    _work(20000)
+    profiler.disable()
+    return Profile(
+        id=profile_id, method="POST", path="/api/v1/chat/", trigger="header",
+        started_at=datetime.utcnow(), duration_ms=0.0, stats=pstats.Stats(profiler).stats,
+    )
+
+def test_profile_exports_pstats_and_speedscope(tmp_path):
+    profile = _profile()
+
+    path = tmp_path / "p1.prof"
+    path.write_bytes(profile.to_pstats())
+    assert any(name == "_leaf" for _, _, name in pstats.Stats(str(path)).stats)
+
+    speedscope = profile.to_speedscope()
+    frames = speedscope["shared"]["frames"]
+    sampled = speedscope["profiles"][0]
+    assert len(sampled["samples"]) == len(sampled["weights"])
+    stacks = [[frames[i]["name"] for i in stack] for stack in sampled["samples"]]
+    assert any(stack[0] == "_work" and stack[-1] == "_leaf" for stack in stacks)
+    # Self times add back up to the root's inclusive time (minus pruned stacks)
+    work = next(stats for (_, _, name), stats in profile.stats.items() if name == "_work")
+    assert sampled["endValue"] <= sum(v[3] for v in profile.stats.values() if not v[4]) + 1e-9
+    assert sampled["endValue"] >= 0.9 * work[3]
+
+def test_store_keeps_most_recent():
+    store = ProfileStore(max_size=2)
+    for profile_id in ("a", "b", "c"):
+        store.add(_profile(profile_id))
+    assert [p.id for p in store.list()] == ["c", "b"]
+    assert store.get("a") is None
@@ -1,9 +1,19 @@
 from fastapi.testclient import TestClient
 from app.main import app
+import json
 import time
+import uuid
 
 client = TestClient(app)
 
+def _auth_headers() -> dict:
+    """Register a throwaway user and log in as it"""
+    email = f"rag-{uuid.uuid4().hex[:8]}@example.com"
+    response = client.post("/api/v1/users/", json={"username": email, "email": email, "password": "secret-password"})
+    assert response.status_code == 201
+    response = client.post("/api/v1/login/access-token", data={"username": email, "password": "secret-password"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
 def test_rag_flow():
     # 1. Create a document with unique info
     unique_fact = "The capital of the Moon is Luna City, established in 2050."
@@ -53,5 +63,65 @@ def test_rag_flow():
     except Exception as e:
         print(f"Ollama might not be running: {e}")
 
+def test_batch_ingestion_streams_per_line_results():
+    lines = [
+        json.dumps({"title": "Batch Fact 1", "content": "Asuncion sits on the Paraguay River.", "document_type": "fact"}),
+        "",
+        "{not json",
+        json.dumps({"title": "Batch Fact 2", "content": "The guarani is the currency of Paraguay.", "document_type": "fact"}),
+    ]
+    response = client.post(
+        "/api/v1/documents/batch",
+        content="\n".join(lines) + "\n",
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    results = [json.loads(line) for line in response.text.splitlines()]
+
+    by_line = {r["line"]: r for r in results if "line" in r}
+    assert by_line[3]["status"] == "error"
+    assert {by_line[1]["status"], by_line[4]["status"]} <= {"created", "error"}
+    assert results[-1]["status"] == "done"
+    assert results[-1]["created"] + results[-1]["failed"] == 3
+
+def test_replace_and_delete_source():
+    source = {
+        "source_url": "test://regulations/visa",
+        "title": "Visa Rules",
+        "content": "A" * 1000 + "B" * 500,
+        "document_type": "regulation",
+    }
+    assert client.put("/api/v1/documents/source", json=source).status_code == 401
+    headers = _auth_headers()
+
+    response = client.put("/api/v1/documents/source", json=source, headers=headers)
+    assert response.status_code == 200
+    first = response.json()
+
+    # Only the tail changes, so the leading chunk keeps its embedding
+    source["content"] = "A" * 1000 + "C" * 500
+    response = client.put("/api/v1/documents/source", json=source, headers=headers)
+    assert response.status_code == 200
+    second = response.json()
+    assert second["kept"] >= 1
+    assert second["kept"] + second["added"] == first["kept"] + first["added"]
+
+    response = client.delete("/api/v1/documents/source", params={"source_url": source["source_url"]}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["deleted"] == second["kept"] + second["added"]
+    response = client.delete("/api/v1/documents/source", params={"source_url": source["source_url"]}, headers=headers)
+    assert response.status_code == 404
+
+def test_update_document_rejects_nulls():
+    headers = _auth_headers()
+    doc = client.post("/api/v1/documents/", json={"title": "Null Check", "content": "Ciudad del Este borders Brazil.", "document_type": "fact"}).json()
+
+    response = client.put(f"/api/v1/documents/{doc['id']}", json={"content": None}, headers=headers)
+    assert response.status_code == 422
+    response = client.put(f"/api/v1/documents/{doc['id']}", json={"title": "Null Check 2", "source_url": None}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["title"] == "Null Check 2"
+    assert client.delete(f"/api/v1/documents/{doc['id']}", headers=headers).status_code == 200
+
 if __name__ == "__main__":
     test_rag_flow()
@@ -0,0 +1,48 @@
+import asyncio
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from app.core import lifespan
+from app.core.config import settings
+from app.main import app
+
+def wait_for(client: TestClient, predicate, timeout: float = 5.0):
+    """Poll /ready until predicate(response) holds"""
+    deadline = time.monotonic() + timeout
+    while True:
+        response = client.get("/ready")
+        if predicate(response) or time.monotonic() > deadline:
+            return response
+        time.sleep(0.01)
+
+def test_ready_reports_each_step_until_warm_up_finishes(monkeypatch):
+    index_loaded = threading.Event()
+
+    async def done() -> None:
+        pass
+
+    async def load_index() -> None:
+        await asyncio.to_thread(index_loaded.wait, 5)
+
+    for name in ("database", "chat_model", "embedding_model"):
+        monkeypatch.setitem(lifespan.WARMUP_STEPS, name, done)
+    monkeypatch.setitem(lifespan.WARMUP_STEPS, "index", load_index)
+    monkeypatch.setattr(settings, "WARMUP_ENABLED", True)
+    monkeypatch.setattr(settings, "RETRIEVAL_MODE", "index")
+    monkeypatch.setattr(settings, "DOCUMENT_NOTIFY_ENABLED", False)
+
+    with TestClient(app) as client:
+        response = wait_for(client, lambda r: list(r.json()["steps"].values()).count("ok") == 3)
+        assert response.status_code == 503
+        assert response.json() == {
+            "status": "warming_up",
+            "steps": {"database": "ok", "index": "pending", "chat_model": "ok", "embedding_model": "ok"},
+        }
+
+        index_loaded.set()
+        response = wait_for(client, lambda r: r.status_code == 200)
+        assert response.status_code == 200
+        assert response.json()["status"] == "ready"
+        assert set(response.json()["steps"].values()) == {"ok"}
@@ -0,0 +1,21 @@
+import numpy as np
+
+from app.services.rerank import mmr
+from app.services.vector_index import normalize
+
+def test_mmr_skips_near_duplicates():
+    query = normalize(np.array([1.0, 0.0, 0.0]))
+    candidates = normalize(np.array([
+        [0.95, 0.30, 0.0],
+        [0.94, 0.31, 0.0],   # near-duplicate of the best hit
+        [0.90, 0.0, 0.40],
+    ]))
+    assert list(mmr(query, candidates, 2, lambda_=0.5)) == [0, 2]
+
+def test_mmr_with_lambda_one_is_relevance_order():
+    rng = np.random.default_rng(0)
+    query = normalize(rng.standard_normal(8))
+    candidates = normalize(rng.standard_normal((20, 8)))
+    expected = np.argsort(-(candidates @ query))[:5]
+    assert list(mmr(query, candidates, 5, lambda_=1.0)) == list(expected)
+    assert len(mmr(query, candidates[:2], 5, lambda_=0.5)) == 2
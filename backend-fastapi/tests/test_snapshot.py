@@ -0,0 +1,90 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services.vector_index import MmapVectorIndex
+from scripts.kb_snapshot import (
+    COLUMNS_NAME, build_index, check_compatible, grow_matrix, read_snapshot, replace_index_file, write_snapshot,
+)
+
+def _columns(count: int):
+    now = datetime(2024, 6, 1)
+    return {
+        "id": [uuid.uuid4() for _ in range(count)],
+        "title": [f"Doc {i}" for i in range(count)],
+        "content": [f"Contenido {i} — ñandutí" for i in range(count)],
+        "source_url": [None] * count,
+        "document_type": ["faq"] * count,
+        "language": ["es"] * count,
+        "created_at": [now + timedelta(seconds=i) for i in range(count)],
+        "updated_at": [now + timedelta(seconds=i) for i in range(count)],
+        "embedded": [i != 1 for i in range(count)],
+    }
+
+def test_snapshot_round_trip_and_index(tmp_path, monkeypatch):
+    columns = _columns(3)
+    matrix = np.random.default_rng(0).normal(size=(3, 8)).astype(np.float32)
+    matrix[1] = 0
+    manifest = write_snapshot(str(tmp_path / "snap"), columns, matrix, "nomic-embed-text")
+    assert manifest["count"] == 3 and manifest["embedded"] == 2 and manifest["dim"] == 8
+
+    read_manifest, read_columns, read_matrix = read_snapshot(str(tmp_path / "snap"))
+    assert read_manifest == manifest
+    assert read_columns["id"] == columns["id"] and read_columns["content"] == columns["content"]
+    assert read_columns["updated_at"] == columns["updated_at"]
+    assert np.array_equal(read_matrix, matrix)
+
+    monkeypatch.setattr(settings, "OLLAMA_EMBEDDING_MODEL", "nomic-embed-text")
+    monkeypatch.setattr(settings, "EMBEDDING_DIMENSIONS", 4)
+    monkeypatch.setattr(settings, "VECTOR_INDEX_PATH", str(tmp_path / "index.bin"))
+    assert check_compatible(read_manifest) is None
+    assert build_index(read_columns, read_matrix) == 2
+    index = MmapVectorIndex(str(tmp_path / "index.bin"))
+    assert len(index) == 2 and index.dim == 4 and index.dimensions == 4
+    found = {doc_id for row in (0, 2) for doc_id, _ in index.search(matrix[row, :4].tolist(), 3)}
+    assert found == {columns["id"][0], columns["id"][2]}
+    assert index.search(matrix[0, :4].tolist(), 1)[0][0] == columns["id"][0]
+
+    monkeypatch.setattr(settings, "OLLAMA_EMBEDDING_MODEL", "mxbai-embed-large")
+    assert "nomic-embed-text" in check_compatible(read_manifest)
+
+def test_damaged_snapshot_is_rejected(tmp_path):
+    write_snapshot(str(tmp_path), _columns(2), np.ones((2, 4), dtype=np.float32), "nomic-embed-text")
+    with open(tmp_path / COLUMNS_NAME, "ab") as f:
+        f.write(b"x")
+    with pytest.raises(ValueError):
+        read_snapshot(str(tmp_path))
+
+def test_import_without_build_removes_stale_index(tmp_path, monkeypatch):
+    columns = _columns(2)
+    matrix = np.ones((2, 4), dtype=np.float32)
+    monkeypatch.setattr(settings, "EMBEDDING_DIMENSIONS", None)
+    monkeypatch.setattr(settings, "VECTOR_INDEX_PATH", str(tmp_path / "index.bin"))
+    build_index(columns, matrix)
+
+    asyncio.run(replace_index_file(columns, matrix, build=False))
+    assert not (tmp_path / "index.bin").exists()
+    asyncio.run(replace_index_file(columns, matrix, build=True))
+    assert len(MmapVectorIndex(str(tmp_path / "index.bin"))) == 1
+
+def test_grow_matrix_keeps_rows():
+    matrix = np.arange(8, dtype=np.float32).reshape(2, 4)
+    grown = grow_matrix(matrix, 3)
+    assert grown.shape[1] == 4 and len(grown) >= 3
+    assert np.array_equal(grown[:2], matrix) and not grown[2:].any()
+    assert grow_matrix(grown, 3) is grown
+
+def test_truncated_snapshot_needs_truncation_on_the_target(tmp_path, monkeypatch):
+    manifest = write_snapshot(str(tmp_path), _columns(2), np.ones((2, 256), dtype=np.float32), "nomic-embed-text", 256)
+    assert manifest["dimensions"] == 256
+    monkeypatch.setattr(settings, "OLLAMA_EMBEDDING_MODEL", "nomic-embed-text")
+    monkeypatch.setattr(settings, "EMBEDDING_DIMENSIONS", None)
+    assert "EMBEDDING_DIMENSIONS=256" in check_compatible(manifest)
+    monkeypatch.setattr(settings, "EMBEDDING_DIMENSIONS", 128)
+    assert check_compatible(manifest) is None
+    monkeypatch.setattr(settings, "EMBEDDING_DIMENSIONS", 512)
+    assert "512" in check_compatible(manifest)
@@ -0,0 +1,6 @@
+from scripts.bench_startup import deferred_imports, import_times
+
+def test_app_import_defers_heavy_dependencies():
+    # fitz, numpy, ollama and passlib must load on first use only
+    times = import_times("app.main")
+    assert deferred_imports(times) == {}
@@ -0,0 +1,22 @@
+import pytest
+
+from app.services.template_service import CompiledTemplate, TemplateError
+
+RUC_FORM = "Solicitud de RUC\nNombre: {{ nombre }}\nCédula: {{cedula}}\nFirma: {{ nombre }}"
+
+def test_render_fills_every_placeholder():
+    compiled = CompiledTemplate(RUC_FORM, ["nombre", "cedula"])
+    assert compiled.render({"nombre": "Ana Souza", "cedula": 1234567}) == (
+        "Solicitud de RUC\nNombre: Ana Souza\nCédula: 1234567\nFirma: Ana Souza"
+    )
+
+def test_values_are_validated_against_declared_fields():
+    compiled = CompiledTemplate(RUC_FORM, ["nombre", "cedula"])
+    with pytest.raises(TemplateError, match="missing fields: cedula"):
+        compiled.render({"nombre": "Ana"})
+    with pytest.raises(TemplateError, match="unknown fields: extra"):
+        compiled.render({"nombre": "Ana", "cedula": "1", "extra": "x"})
+
+def test_undeclared_placeholder_is_rejected_at_compile_time():
+    with pytest.raises(TemplateError):
+        CompiledTemplate("{{ nombre }} {{ pasaporte }}", ["nombre"])
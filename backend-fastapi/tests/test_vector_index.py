@@ -0,0 +1,138 @@
+import asyncio
+import threading
+import time
+import uuid
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.document_service import DocumentService
+from app.services.vector_index import (
+    MmapVectorIndex,
+    VectorIndex,
+    file_identity,
+    normalize,
+    scored_top_k,
+    write_index_file,
+)
+
+def make_index(n: int = 50, dim: int = 16, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    ids = [uuid.uuid4() for _ in range(n)]
+    vectors = rng.standard_normal((n, dim))
+    return VectorIndex.from_rows(zip(ids, vectors.tolist())), ids, vectors
+
+def test_search_matches_brute_force_cosine():
+    index, ids, vectors = make_index()
+    query = vectors[7] + 0.1
+    cosine = vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query))
+    expected = [ids[i] for i in np.argsort(-cosine)[:5]]
+
+    hits = index.search(query.tolist(), 5)
+    assert [doc_id for doc_id, _ in hits] == expected
+    assert np.isclose(hits[0][1], cosine.max(), atol=1e-5)
+
+def test_add_replaces_and_remove_swaps():
+    index, ids, vectors = make_index(n=3, dim=4)
+    index.add([ids[0]], [vectors[2].tolist()])
+    assert len(index) == 3
+
+    index.remove([ids[0]])
+    assert len(index) == 2
+    assert ids[0] not in [doc_id for doc_id, _ in index.search(vectors[2].tolist(), 3)]
+    assert index.search(vectors[2].tolist(), 1)[0][0] == ids[2]
+
+def test_empty_rows_and_mismatched_query():
+    index = VectorIndex.from_rows([(uuid.uuid4(), None), (uuid.uuid4(), [])])
+    assert len(index) == 0
+    assert index.search([1.0, 0.0], 3) == []
+
+def test_sharded_scoring_matches_single_thread():
+    rng = np.random.default_rng(1)
+    matrix = normalize(rng.standard_normal((40000, 8)))
+    query = normalize(rng.standard_normal(8))
+    masked = np.zeros(len(matrix), dtype=bool)
+    masked[::7] = True
+
+    positions, scores = scored_top_k(matrix, query, 10, masked=masked)
+    sharded_positions, sharded_scores = scored_top_k(matrix, query, 10, masked=masked, shards=4)
+    assert list(sharded_positions) == list(positions)
+    assert np.allclose(sharded_scores, scores)
+    assert not masked[sharded_positions].any()
+
+def test_growing_shard_pool_shuts_down_the_old_one():
+    from app.services import vector_index
+
+    size = vector_index._shard_executor_size
+    assert [f.result() for f in vector_index._submit_shards(size + 1, lambda a, b: a + b, [(1, 2)])] == [3]
+    old = vector_index._shard_executor
+    assert [f.result() for f in vector_index._submit_shards(size + 2, lambda a, b: a * b, [(2, 3), (4, 5)])] == [6, 20]
+    assert vector_index._shard_executor is not old and vector_index._shard_executor_size == size + 2
+    assert old._shutdown
+
+def test_index_file_roundtrip_and_overlay(tmp_path):
+    index, ids, vectors = make_index(n=20, dim=8)
+    path = str(tmp_path / "index.bin")
+    write_index_file(path, index.ids, index.matrix, model="nomic-embed-text")
+
+    mapped = MmapVectorIndex(path)
+    assert mapped.model == "nomic-embed-text"
+    assert len(mapped) == 20
+    expected = index.search(vectors[3].tolist(), 3)
+    hits = mapped.search(vectors[3].tolist(), 3)
+    assert [doc_id for doc_id, _ in hits] == [doc_id for doc_id, _ in expected]
+    assert np.allclose([score for _, score in hits], [score for _, score in expected], atol=1e-5)
+
+    # Replacing a base row masks it in favour of the overlay copy
+    mapped.add([ids[3]], [(-vectors[3]).tolist()])
+    assert len(mapped) == 20
+    assert ids[3] not in [doc_id for doc_id, _ in mapped.search(vectors[3].tolist(), 3)]
+
+    assert np.allclose(mapped.vectors([ids[3], ids[4]]), [normalize(-vectors[3]), normalize(vectors[4])], atol=1e-5)
+
+    mapped.remove([ids[5]])
+    assert len(mapped) == 19
+    assert ids[5] not in [doc_id for doc_id, _ in mapped.search(vectors[5].tolist(), 20)]
+
+def test_index_file_is_replaced_atomically(tmp_path):
+    index, _, _ = make_index(n=5, dim=4)
+    path = str(tmp_path / "index.bin")
+    write_index_file(path, index.ids, index.matrix, model="m")
+    old = MmapVectorIndex(path)
+
+    write_index_file(path, [], [], model="m")
+    assert file_identity(path) != old.identity
+    assert len(MmapVectorIndex(path)) == 0
+    assert len(old.search([1.0, 0.0, 0.0, 0.0], 5)) == 5  # old mapping still readable
+
+def test_search_scores_off_the_event_loop(monkeypatch):
+    index, ids, vectors = make_index()
+    threads = []
+    search = index.search
+
+    def recording_search(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return search(*args, **kwargs)
+
+    monkeypatch.setattr(index, "search", recording_search)
+    monkeypatch.setattr(settings, "RETRIEVAL_MODE", "index")
+    monkeypatch.setattr(settings, "EMBEDDING_DIMENSIONS", None)
+    service = DocumentService()
+    service.index = index
+    service._index_checked_at = time.monotonic()
+    service.content_cache.set(ids[0], "doc 0")
+
+    results = asyncio.run(service.search_by_embedding(None, vectors[0].tolist(), k=1))
+    assert results == [(results[0][0], "doc 0")]
+    assert threads and threads[0] is not threading.main_thread()
+
+def test_mmap_index_membership_follows_masking(tmp_path):
+    index, ids, vectors = make_index(n=4, dim=4)
+    write_index_file(str(tmp_path / "index.bin"), index.ids, index.matrix, "m")
+    mapped = MmapVectorIndex(str(tmp_path / "index.bin"))
+    assert ids[0] in mapped
+    mapped.remove([ids[0]])
+    assert ids[0] not in mapped and ids[1] in mapped
+    new_id = uuid.uuid4()
+    mapped.add([new_id], vectors[:1])
+    assert new_id in mapped